@@ -0,0 +1,67 @@
+# -*- mode: python ; coding: utf-8 -*-
+# Perfil de inicialização rápida do ListaMaterialApp.
+# - Pasta (onedir) em vez de executável único: nada é descompactado para uma pasta
+#   temporária a cada abertura; os arquivos de dados ficam na pasta e só são lidos
+#   quando usados.
+# - Só os módulos de src que o aplicativo importa (sem copiar src inteiro como dados)
+#   e pacotes que existem no venv de build mas o aplicativo não usa ficam de fora.
+# - Sem UPX: descompactar as DLLs a cada abertura custa mais do que o espaço economizado.
+# Gerar:  python -m PyInstaller --noconfirm ListaMaterialApp_rapido.spec
+# Saída:  dist\ListaMaterialApp\ListaMaterialApp.exe (distribuir a pasta inteira)
+# Medir:  python src\medir_inicio.py dist\ListaMaterialApp\ListaMaterialApp.exe
+
+EXCLUIDOS = [
+    # Interfaces gráficas e pacotes científicos instalados no venv de build
+    'PyQt6', 'PyQt5', 'PySide6', 'PySide2', 'matplotlib', 'numpy', 'pandas', 'scipy',
+    # Ferramentas de desenvolvimento e do notebook
+    'IPython', 'jupyter', 'jupyter_client', 'jupyter_core', 'ipykernel', 'notebook', 'nbformat',
+    'pytest', 'setuptools', 'pkg_resources', 'pip', 'wheel',
+    # Módulos da biblioteca padrão que o aplicativo não usa
+    'pydoc', 'doctest', 'unittest', 'lib2to3', 'xmlrpc', 'sqlite3', 'curses', 'tkinter.test',
+    # Imagens no openpyxl (import opcional)
+    'PIL',
+]
+
+a = Analysis(
+    ['src\\gui.py'],
+    pathex=['src'],
+    binaries=[],
+    datas=[('modelo.pdf', '.')],
+    # Módulos importados dentro de funções (carregados só quando usados)
+    hiddenimports=['processor', 'cache_template', 'colunar', 'entradas', 'leitores', 'leitor_rtf', 'motor_xlsx', 'inicializacao', 'servico'],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=EXCLUIDOS,
+    noarchive=False,
+    optimize=1,
+)
+pyz = PYZ(a.pure)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,
+    name='ListaMaterialApp',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=False,
+    console=False,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+    icon=['6750096.ico'],
+)
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='ListaMaterialApp',
+)
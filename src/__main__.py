@@ -0,0 +1,12 @@
+import os
+import sys
+
+# Permite 'python -m src' a partir da raiz do projeto: os módulos de src usam imports diretos
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cli import main
+
+# Protegido: com o método 'spawn' (padrão no Windows) os processos do pool de extração
+# importam este módulo de novo e não podem reexecutar a linha de comando
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+import importlib
+import threading
+import time
+
+# ==============================================================================
+# CARREGAMENTO ADIADO DOS MÓDULOS PESADOS
+# ==============================================================================
+# A interface não importa o processor (openpyxl, lxml e os leitores) ao abrir: a
+# janela aparece logo e uma thread em segundo plano importa esses módulos enquanto
+# o usuário escolhe os arquivos. Na hora de processar, processor() devolve o
+# módulo já carregado (ou espera o aquecimento terminar, se ainda estiver rodando).
+# O python-docx só é usado sem lxml (leitor de reserva) e continua sob demanda.
+
+# Na ordem em que são importados; os que faltarem no ambiente são ignorados
+MODULOS_PESADOS = ('openpyxl', 'lxml.etree', 'processor', 'colunar', 'entradas', 'leitores', 'leitor_rtf',
+                   'motor_xlsx', 'cache_template')
+
+_thread = None
+_trava = threading.Lock()
+_tempos = {}
+
+def _aquecer():
+    for nome in MODULOS_PESADOS:
+        inicio = time.perf_counter()
+        try:
+            importlib.import_module(nome)
+        except ImportError:
+            continue
+        _tempos[nome] = (time.perf_counter() - inicio) * 1000
+
+def iniciar():
+    """Começa a importar os módulos pesados em segundo plano (só na 1ª chamada). Devolve a thread."""
+    global _thread
+    with _trava:
+        if _thread is None:
+            _thread = threading.Thread(target=_aquecer, name="aquecimento", daemon=True)
+            _thread.start()
+        return _thread
+
+def pronto():
+    """O aquecimento já terminou?"""
+    return _thread is not None and not _thread.is_alive()
+
+def esperar(tempo_limite=None):
+    """Espera o aquecimento terminar (iniciando-o, se preciso). Retorna True se terminou."""
+    thread = iniciar()
+    thread.join(tempo_limite)
+    return not thread.is_alive()
+
+def tempos_ms():
+    """Tempo de import de cada módulo aquecido até agora: {nome: ms}."""
+    return dict(_tempos)
+
+def processor():
+    """O módulo processor, com os módulos pesados já importados."""
+    esperar()
+    import processor as modulo
+    return modulo
@@ -0,0 +1,347 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import zipfile
+from datetime import datetime
+from unittest import mock
+from xml.sax.saxutils import escape
+
+# ==============================================================================
+# BENCHMARK COM LISTAS E TEMPLATES SINTÉTICOS
+# ==============================================================================
+# Gera listas do MCalc (.docx e .rtf) e templates com o número de linhas pedido,
+# mede cada etapa do processamento e grava os tempos em JSON. Com --comparar, os
+# tempos são conferidos contra um JSON anterior para pegar regressões.
+# Uso: python src/benchmark.py [--linhas 100 1000 10000 50000] [--linhas-secao 1000] [--saida bench.json]
+#                              [--comparar base.json] [--tolerancia 0.2]
+
+VERSAO_BENCHMARK = 1
+MOTORES = ("openpyxl", "streaming", "patch")
+
+# Seções do template (coluna A) na ordem em que aparecem, e as vigas W com linha própria
+SECOES = ("U.s", "U.e", "L DOBRADO", "TUBO", "FERRO MECANICO RED.")
+BITOLAS_W = ("W150X13", "W150X18", "W150X22,5", "W200X15", "W200X19,3", "W200X26,6", "W250X25,3",
+             "W250X32,7", "W310X32,7", "W310X38,7", "W360X44", "W410X53", "W460X60", "W530X72")
+ACOS = ("ASTM A36", "ASTM A36", "ASTM A36", "ASTM-A572-GR50")
+
+# ==============================================================================
+# GERAÇÃO DOS ARQUIVOS
+# ==============================================================================
+
+def _descricao_aleatoria(sorteio):
+    """Descrição de um perfil no formato do MCalc, com a mistura de tipos de uma obra típica."""
+    tipo = sorteio.choices(("W", "U", "TERCA", "CA", "L", "TUBO"), weights=(2, 4, 3, 2, 2, 1))[0]
+    if tipo == "W":
+        altura, massa = sorteio.choice(BITOLAS_W)[1:].split("X")
+        return f"W {altura} x {massa.replace(',', '.')}"
+    if tipo == "U":
+        return f"[ {sorteio.choice((100, 150, 200, 250))} x {sorteio.choice((40, 50, 65, 75))} x {sorteio.choice(('2', '2.25', '3', '3.75'))}"
+    if tipo == "TERCA":
+        return f"UENR {sorteio.choice((100, 150, 200))} x {sorteio.choice((50, 60))} x {sorteio.choice((17, 20))} x {sorteio.choice(('2', '2.65', '3'))}"
+    if tipo == "CA":
+        return f"CA {sorteio.choice((150, 250, 300))} x {sorteio.choice((45, 75))} x {sorteio.choice((17, 25))} x {sorteio.choice(('3', '3.75'))}"
+    if tipo == "L":
+        return sorteio.choice(('L 2"x1/8"', 'L 1.1/2"x1/8"', 'L 3"x1/4"', f"L DOBRADO {sorteio.choice((40, 50, 60))} x 3"))
+    return sorteio.choice(('TUBO 2"', 'TUBO 3"', 'RED 1"', 'RED 3/4"'))
+
+def gerar_linhas(quantidade, semente=0):
+    """Linhas (perfil, aço, L total em cm, peso) como texto, como os leitores devolvem."""
+    sorteio = random.Random(semente)
+    linhas = []
+    for _ in range(quantidade):
+        perfil = _descricao_aleatoria(sorteio)
+        comprimento = f"{sorteio.uniform(50, 30000):.2f}"
+        if sorteio.random() < 0.05:
+            # L total zerado: o comprimento sai da descrição (C=...)
+            perfil, comprimento = f"{perfil} C={sorteio.randint(500, 12000)}", "0"
+        linhas.append((perfil, sorteio.choice(ACOS), comprimento, f"{sorteio.uniform(1, 2000):.2f}"))
+    return linhas
+
+TIPOS_CONTEUDO_DOCX = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+RELACOES_DOCX = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/></Relationships>'
+)
+CABECALHO_LISTA = ("Perfil", "Aço", "L total (cm)", "Peso (kg)")
+
+def _celula_docx(textos):
+    paragrafos = "".join(f'<w:p><w:r><w:t xml:space="preserve">{escape(texto)}</w:t></w:r></w:p>' for texto in textos)
+    return f"<w:tc>{paragrafos or '<w:p/>'}</w:tc>"
+
+def gravar_docx(caminho, linhas):
+    """Lista no formato do MCalc: 1ª tabela com o cabeçalho e uma linha com um parágrafo por perfil em cada coluna."""
+    colunas = list(zip(*linhas)) if linhas else [(), (), (), ()]
+    documento = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body><w:tbl>'
+        '<w:tblGrid>' + '<w:gridCol w:w="2000"/>' * 4 + '</w:tblGrid>'
+        f'<w:tr>{"".join(_celula_docx([titulo]) for titulo in CABECALHO_LISTA)}</w:tr>'
+        f'<w:tr>{"".join(_celula_docx(coluna) for coluna in colunas)}</w:tr>'
+        '</w:tbl><w:p/></w:body></w:document>'
+    )
+    with zipfile.ZipFile(caminho, "w", zipfile.ZIP_DEFLATED) as arquivo:
+        arquivo.writestr("[Content_Types].xml", TIPOS_CONTEUDO_DOCX)
+        arquivo.writestr("_rels/.rels", RELACOES_DOCX)
+        arquivo.writestr("word/document.xml", documento)
+
+def _texto_rtf(texto):
+    partes = []
+    for caractere in texto:
+        if caractere in "\\{}":
+            partes.append("\\" + caractere)
+        elif ord(caractere) < 128:
+            partes.append(caractere)
+        else:
+            partes.extend(f"\\'{byte:02x}" for byte in caractere.encode("cp1252", "replace"))
+    return "".join(partes)
+
+def gravar_rtf(caminho, linhas):
+    """A mesma tabela de gravar_docx, como o RTF exportado pelo MCalc (parágrafos da célula separados por \\par)."""
+    colunas = list(zip(*linhas)) if linhas else [(), (), (), ()]
+    definicao = "\\trowd" + "".join(f"\\cellx{2000 * (i + 1)}" for i in range(4)) + "\n"
+
+    def linha_rtf(celulas):
+        return definicao + "".join(
+            "\\pard\\intbl " + "\\par ".join(_texto_rtf(texto) for texto in celula) + "\\cell\n" for celula in celulas
+        ) + "\\row\n"
+
+    conteudo = ("{\\rtf1\\ansi\\ansicpg1252\\deff0{\\fonttbl{\\f0 Arial;}}\n"
+                + linha_rtf([[titulo] for titulo in CABECALHO_LISTA]) + linha_rtf(colunas) + "\\pard\\par\n}")
+    with open(caminho, "w", encoding="ascii") as arquivo:
+        arquivo.write(conteudo)
+
+def gravar_template(caminho, linhas_por_secao):
+    """
+    Template com a estrutura do TABELA-DE-AÇO: cabeçalho nas linhas 1-3, 'linhas_por_secao' linhas
+    livres para cada seção, uma linha por viga W, a linha TOTAL e o bloco de resumo com fórmulas.
+    """
+    import openpyxl
+
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "dobrados"
+    sheet["A1"] = "Tabela de aço sintética (benchmark)"
+    sheet["A2"] = "DESCRIÇAO"
+    linha = 4
+    for secao in SECOES:
+        for _ in range(linhas_por_secao):
+            sheet.cell(row=linha, column=1, value=secao)
+            sheet.cell(row=linha, column=9, value="ASTM A36")
+            linha += 1
+    for bitola in BITOLAS_W:
+        sheet.cell(row=linha, column=1, value=bitola)
+        linha += 1
+    ultima_linha_itens = linha - 1
+    sheet.cell(row=linha, column=1, value="TOTAL")
+    sheet.cell(row=linha, column=10, value=f"=SUM(J4:J{ultima_linha_itens})")
+    sheet.cell(row=linha, column=17, value=f"=SUM(Q4:Q{ultima_linha_itens})")
+    sheet.cell(row=linha + 2, column=1, value="RESUMO DE AÇO")
+    for deslocamento, secao in enumerate(SECOES, start=3):
+        sheet.cell(row=linha + deslocamento, column=1, value=secao)
+        sheet.cell(row=linha + deslocamento, column=17,
+                   value=f'=SUMIF(A4:A{ultima_linha_itens},"{secao}",Q4:Q{ultima_linha_itens})')
+    workbook.save(caminho)
+
+# ==============================================================================
+# MEDIÇÃO
+# ==============================================================================
+
+def medir(funcao, repeticoes):
+    """Menor tempo (ms) entre as repetições de funcao() e o resultado da última chamada."""
+    melhor = None
+    resultado = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        decorrido = (time.perf_counter() - inicio) * 1000
+        melhor = decorrido if melhor is None else min(melhor, decorrido)
+    return melhor, resultado
+
+def medir_caso(pasta, quantidade, linhas_por_secao, repeticoes=3, motores=MOTORES, semente=0):
+    """Gera os arquivos de um caso e mede cada etapa. Retorna o dict do caso para o JSON."""
+    import openpyxl
+    import processor
+    from colunar import ListaMateriais
+
+    linhas = gerar_linhas(quantidade, semente)
+    caminho_docx = os.path.join(pasta, f"lista_{quantidade}.docx")
+    caminho_rtf = os.path.join(pasta, f"lista_{quantidade}.rtf")
+    caminho_template = os.path.join(pasta, f"template_{linhas_por_secao}.xlsx")
+    gravar_docx(caminho_docx, linhas)
+    gravar_rtf(caminho_rtf, linhas)
+    if not os.path.exists(caminho_template):
+        gravar_template(caminho_template, linhas_por_secao)
+
+    etapas = {}
+    etapas['extracao_docx'], dados = medir(lambda: processor.extrair_dados_word(caminho_docx), repeticoes)
+    etapas['extracao_rtf'], _ = medir(lambda: processor.extrair_dados_word(caminho_rtf), repeticoes)
+
+    def classificar():
+        processor.classificar_e_mapear_perfil.cache_clear()
+        return processor.classificar_varios(dados.perfis)
+    etapas['classificacao'], _ = medir(classificar, repeticoes)
+    etapas['conversao_colunas'], _ = medir(lambda: ListaMateriais.de_linhas(linhas), repeticoes)
+
+    etapas['indexacao_template'], indice = medir(
+        lambda: processor.indexar_template(caminho_template, usar_cache=False), repeticoes)
+    itens_sem_linha = []
+
+    def buscar_linhas():
+        itens_sem_linha.clear()
+        return processor.planejar_preenchimento(indice.copiar(), dados, itens_sem_linha)
+    etapas['busca_linhas'], plano = medir(buscar_linhas, repeticoes)
+
+    # Linhas ocultas: varredura original das células x estado calculado do plano
+    sheet = openpyxl.load_workbook(caminho_template).active
+    for linha, gravacoes in plano.items():
+        for coluna, valor in gravacoes.items():
+            sheet.cell(row=linha, column=coluna).value = valor
+    etapas['ocultar_linhas_vazias'], _ = medir(lambda: processor.ocultar_linhas_vazias(sheet), repeticoes)
+    etapas['linhas_ocultas_do_plano'], _ = medir(
+        lambda: processor.aplicar_linhas_ocultas(sheet, processor.estado_linhas_ocultas(indice, plano)), repeticoes)
+
+    resultados_motores = {}
+    for motor in motores:
+        saida = os.path.join(pasta, f"saida_{quantidade}_{motor}.xlsx")
+        relatorios = []
+
+        def preencher():
+            relatorio = {}
+            with contextlib.redirect_stdout(io.StringIO()):
+                processor.preencher_planilha_excel(caminho_template, dados, motor=motor, caminho_saida=saida,
+                                                   relatorio=relatorio)
+            relatorios.append(relatorio)
+        total, _ = medir(preencher, repeticoes)
+        melhor = min(relatorios, key=lambda relatorio: sum(relatorio['tempos_ms'].values()))
+        resultados_motores[motor] = {
+            'total_ms': total,
+            'tempos_ms': melhor['tempos_ms'],
+            'tamanho_saida': os.path.getsize(saida),
+        }
+
+    return {
+        'linhas_lista': quantidade,
+        'linhas_por_secao': linhas_por_secao,
+        'itens': len(dados),
+        'linhas_preenchidas': len(plano),
+        'itens_sem_linha': len(itens_sem_linha),
+        'etapas_ms': etapas,
+        'motores': resultados_motores,
+    }
+
+def executar(quantidades, linhas_por_secao, repeticoes=3, motores=MOTORES, semente=0, pasta=None):
+    """Mede todos os casos e devolve o dict completo do JSON de resultados."""
+    with contextlib.ExitStack() as pilha:
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        else:
+            pasta = pilha.enter_context(tempfile.TemporaryDirectory(prefix="benchmark_"))
+        # Cache de templates próprio: não usa nem altera o cache do usuário (a variável volta ao valor
+        # anterior na saída, antes de a pasta temporária ser apagada)
+        pilha.enter_context(mock.patch.dict(os.environ, {"AUT_LISTA_CACHE": os.path.join(pasta, "cache")}))
+        casos = []
+        for quantidade in quantidades:
+            print(f"[BENCHMARK] {quantidade} linhas...", file=sys.stderr)
+            casos.append(medir_caso(pasta, quantidade, linhas_por_secao, repeticoes, motores, semente))
+    return {
+        'versao': VERSAO_BENCHMARK,
+        'data': datetime.now().isoformat(timespec="seconds"),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'repeticoes': repeticoes,
+        'semente': semente,
+        'casos': casos,
+    }
+
+# ==============================================================================
+# COMPARAÇÃO COM UMA EXECUÇÃO ANTERIOR
+# ==============================================================================
+
+def _tempos_do_caso(caso):
+    """{'etapa': ms} com as etapas e os tempos de cada motor ('motor/patch/gravacao', 'motor/patch/total')."""
+    tempos = dict(caso['etapas_ms'])
+    for motor, resultado in caso['motores'].items():
+        tempos[f"motor/{motor}/total"] = resultado['total_ms']
+        for etapa, ms in resultado['tempos_ms'].items():
+            tempos[f"motor/{motor}/{etapa}"] = ms
+    return tempos
+
+def comparar(atual, base, tolerancia=0.2, minimo_ms=1.0):
+    """
+    Regressões do resultado 'atual' em relação a 'base': [(linhas_lista, etapa, base_ms, atual_ms)]
+    das etapas mais de 'tolerancia' (fração) mais lentas. Etapas abaixo de 'minimo_ms' na base são
+    ignoradas (ruído de medição); casos são pareados por tamanho da lista e do template.
+    """
+    casos_base = {(caso['linhas_lista'], caso['linhas_por_secao']): caso for caso in base['casos']}
+    regressoes = []
+    for caso in atual['casos']:
+        anterior = casos_base.get((caso['linhas_lista'], caso['linhas_por_secao']))
+        if anterior is None:
+            continue
+        tempos_base = _tempos_do_caso(anterior)
+        for etapa, ms in _tempos_do_caso(caso).items():
+            base_ms = tempos_base.get(etapa)
+            if base_ms is not None and base_ms >= minimo_ms and ms > base_ms * (1 + tolerancia):
+                regressoes.append((caso['linhas_lista'], etapa, base_ms, ms))
+    return regressoes
+
+def imprimir_resultados(resultado):
+    for caso in resultado['casos']:
+        print(f"\n[BENCHMARK] {caso['linhas_lista']} linhas | template com {caso['linhas_por_secao']} linhas por seção"
+              f" | {caso['linhas_preenchidas']} linhas preenchidas, {caso['itens_sem_linha']} itens sem linha")
+        for etapa, ms in caso['etapas_ms'].items():
+            print(f"  {etapa:<26} {ms:10.1f} ms")
+        for motor, dados in caso['motores'].items():
+            detalhes = ", ".join(f"{etapa} {ms:.1f}" for etapa, ms in dados['tempos_ms'].items())
+            print(f"  motor {motor:<20} {dados['total_ms']:10.1f} ms  ({detalhes})")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mede o processamento com listas e templates sintéticos.")
+    parser.add_argument("--linhas", type=int, nargs="+", default=[100, 1000, 10000, 50000],
+                        help="Tamanhos das listas geradas (nº de perfis)")
+    parser.add_argument("--linhas-secao", type=int, default=1000, help="Linhas livres por seção no template gerado")
+    parser.add_argument("--repeticoes", type=int, default=3, help="Repetições de cada medida (vale o menor tempo)")
+    parser.add_argument("--motores", nargs="+", default=list(MOTORES), choices=MOTORES)
+    parser.add_argument("--semente", type=int, default=0, help="Semente das listas geradas")
+    parser.add_argument("--pasta", help="Guarda os arquivos gerados nesta pasta (padrão: pasta temporária)")
+    parser.add_argument("--saida", default="benchmark.json", help="Arquivo JSON com os resultados")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para apontar regressões")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="Piora aceita antes de acusar regressão (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    resultado = executar(args.linhas, args.linhas_secao, args.repeticoes, args.motores, args.semente, args.pasta)
+    with open(args.saida, "w", encoding="utf-8") as arquivo:
+        json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+    imprimir_resultados(resultado)
+    print(f"\n[BENCHMARK] Resultados gravados em {args.saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            base = json.load(arquivo)
+        regressoes = comparar(resultado, base, args.tolerancia)
+        for linhas, etapa, base_ms, ms in regressoes:
+            print(f"[REGRESSÃO] {linhas} linhas, {etapa}: {base_ms:.1f} ms -> {ms:.1f} ms")
+        if regressoes:
+            return 1
+        print(f"[BENCHMARK] Nenhuma regressão acima de {args.tolerancia:.0%} em relação a {args.comparar}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
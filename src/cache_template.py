@@ -0,0 +1,86 @@
+import hashlib
+import json
+import os
+
+# ==============================================================================
+# CACHE EM DISCO DA ESTRUTURA DOS TEMPLATES
+# ==============================================================================
+# Os mesmos poucos templates da empresa são abertos a cada execução. A estrutura
+# descoberta na leitura (seções, linhas W, início do resumo, linhas já preenchidas)
+# é gravada num JSON por template, identificado pelo hash do conteúdo e pelo mtime,
+# com um índice por aba já lida (a aba ativa fica na chave "").
+# Nas execuções seguintes o índice sai do cache e só as gravações são feitas.
+
+# Mudou o formato do índice? Incremente para invalidar os caches antigos.
+VERSAO_CACHE = 2
+
+def pasta_cache_padrao():
+    """Pasta do cache: AUT_LISTA_CACHE, ou a pasta de cache do usuário (LOCALAPPDATA no Windows, ~/.cache)."""
+    pasta = os.environ.get("AUT_LISTA_CACHE")
+    if pasta:
+        return pasta
+    base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "aut_lista_material", "templates")
+
+def chave_template(caminho_planilha):
+    """Impressão digital do template: sha256 do conteúdo + mtime (ns) do arquivo."""
+    with open(caminho_planilha, "rb") as arquivo:
+        resumo = hashlib.sha256(arquivo.read()).hexdigest()
+    return f"{resumo[:40]}-{os.stat(caminho_planilha).st_mtime_ns}"
+
+def _caminho_entrada(chave, pasta):
+    return os.path.join(pasta or pasta_cache_padrao(), f"{chave}.json")
+
+def _ler_entrada(destino):
+    try:
+        with open(destino, encoding="utf-8") as arquivo:
+            entrada = json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+    if entrada.get("versao") != VERSAO_CACHE:
+        return None
+    return entrada
+
+def carregar(caminho_planilha, pasta=None, aba=None):
+    """
+    Estrutura da aba 'aba' (None = aba ativa) guardada no cache (o dict de IndiceTemplate.para_dict),
+    ou None se não houver entrada válida para o conteúdo/mtime atuais do arquivo.
+    """
+    try:
+        entrada = _ler_entrada(_caminho_entrada(chave_template(caminho_planilha), pasta))
+    except OSError:
+        return None
+    if entrada is None:
+        return None
+    return entrada.get("abas", {}).get(aba or "")
+
+def salvar(caminho_planilha, dados_indice, pasta=None, aba=None):
+    """
+    Grava a estrutura da aba 'aba' (None = aba ativa) no cache, mantendo as outras abas já
+    guardadas para o mesmo arquivo. Falhas de escrita são ignoradas (o cache é opcional).
+    """
+    try:
+        destino = _caminho_entrada(chave_template(caminho_planilha), pasta)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        abas = (_ler_entrada(destino) or {}).get("abas", {})
+        abas[aba or ""] = dados_indice
+        temporario = f"{destino}.{os.getpid()}.tmp"
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            json.dump({"versao": VERSAO_CACHE, "template": os.path.basename(caminho_planilha),
+                       "abas": abas}, arquivo, ensure_ascii=False, separators=(",", ":"))
+        # Troca atômica: outro processo nunca lê uma entrada pela metade
+        os.replace(temporario, destino)
+        _remover_entradas_antigas(destino)
+    except OSError:
+        pass
+
+def _remover_entradas_antigas(destino):
+    """Apaga entradas do mesmo conteúdo com outro mtime (o template foi copiado ou salvo de novo)."""
+    pasta, nome = os.path.split(destino)
+    prefixo = nome.split("-", 1)[0] + "-"
+    for outro in os.listdir(pasta):
+        if outro.startswith(prefixo) and outro.endswith(".json") and outro != nome:
+            try:
+                os.remove(os.path.join(pasta, outro))
+            except OSError:
+                pass
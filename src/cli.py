@@ -0,0 +1,158 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+
+# ==============================================================================
+# LINHA DE COMANDO (SEM INTERFACE GRÁFICA)
+# ==============================================================================
+# Não importa tkinter: sobe rápido e pode rodar em scripts, agendadores e servidores.
+# Uso: python -m src <listas ou pastas> -t TEMPLATE.xlsx [-o SAIDA] [--jobs N] [--engine patch]
+
+MOTORES = ("openpyxl", "streaming", "patch")
+
+def coletar_entradas(caminhos):
+    """Expande pastas em listas do MCalc; arquivos informados diretamente são mantidos na ordem."""
+    from lote import listar_listas
+
+    arquivos = []
+    for caminho in caminhos:
+        if os.path.isdir(caminho):
+            arquivos.extend(listar_listas(caminho))
+        else:
+            arquivos.append(caminho)
+    return arquivos
+
+def _item_relatorio(item):
+    """Converte um item do resumo do lote para o formato JSON do relatório."""
+    resultado = {
+        "arquivo": item["arquivo"],
+        "saida": item["saida"],
+        "itens": item["itens"],
+        "linhas_preenchidas": item.get("linhas_preenchidas", []),
+        "faixas_ocultas": item.get("faixas_ocultas", []),
+        "itens_sem_linha": [registro[0] for registro in item.get("itens_sem_linha", [])],
+        "comprimento_da_descricao": item["comprimento_da_descricao"],
+        "tempos_ms": dict(item.get("tempos_ms", {}), extracao=item["extracao_ms"], preenchimento=item["preenchimento_ms"]),
+        "erro": item["erro"],
+    }
+    if "agrupamentos" in item:
+        # Perfis repetidos somados: cada item agregado aponta para as linhas de origem
+        resultado["agrupamentos"] = item["agrupamentos"]
+    if "modo" in item:
+        # Preenchimento incremental: o que precisou ser regravado na planilha existente
+        resultado["incremental"] = {
+            "modo": item["modo"],
+            "registros_alterados": item["registros_alterados"],
+            "linhas_regravadas": item["linhas_regravadas"],
+        }
+    return resultado
+
+def _processar_via_servico(args, arquivos, pasta_saida, caminho_saida):
+    """Resumo do lote feito pelo serviço local, ou None se ele não respondeu (processa localmente)."""
+    from servico import processar_lote_via_servico
+
+    try:
+        return processar_lote_via_servico(arquivos, args.template, args.servico, pasta_saida=pasta_saida,
+                                          motor=args.engine, caminho_saida=caminho_saida)
+    except ConnectionError as e:
+        print(f"[AVISO] Serviço {args.servico} indisponível ({e}): processando localmente.")
+        return None
+
+def montar_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m src",
+        description="Preenche a planilha de aço a partir de listas de material do MCalc (.docx ou .rtf).",
+    )
+    parser.add_argument("entradas", nargs="+", help="Listas (.docx, .rtf) ou pastas com listas")
+    parser.add_argument("-t", "--template", required=True, help="Planilha modelo (.xlsx)")
+    parser.add_argument("-o", "--saida",
+                        help="Arquivo gerado (uma lista ou --combinado) ou pasta de saída (várias listas)")
+    parser.add_argument("--combinado", action="store_true", help="Junta todas as listas numa única planilha")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="Nº de processos para ler as listas (padrão: nº de núcleos)")
+    parser.add_argument("--chunk", type=int, default=None, help="Nº de listas por tarefa enviada a cada processo")
+    parser.add_argument("--engine", default="patch", choices=MOTORES, help="Motor de gravação do .xlsx")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Atualiza a planilha já gerada regravando só as linhas dos itens alterados (motor patch)")
+    parser.add_argument("--agrupar", action="store_true",
+                        help="Soma comprimentos e pesos dos perfis repetidos (mesmo perfil, aço e tipo) numa única linha")
+    parser.add_argument("--sem-cache", action="store_true",
+                        help="Lê a estrutura do template do arquivo, sem ler nem gravar o cache de templates")
+    parser.add_argument("--servico", nargs="?", const="127.0.0.1:8765", metavar="HOST:PORTA",
+                        help="Envia as listas ao serviço local (src/servico.py) em vez de processar aqui;"
+                             " se ele não responder, processa localmente")
+    parser.add_argument("--relatorio", default="-",
+                        help="Arquivo do relatório JSON ('-' = saída padrão, que é o padrão)")
+    return parser
+
+def main(argv=None):
+    parser = montar_parser()
+    args = parser.parse_args(argv)
+    if args.servico and (args.combinado or args.incremental or args.agrupar):
+        parser.error("--servico preenche cada lista separadamente: não combina com --combinado, --incremental ou --agrupar")
+    inicio = time.perf_counter()
+
+    if not os.path.exists(args.template):
+        print(f"Planilha Excel não encontrada: {args.template}", file=sys.stderr)
+        return 2
+
+    arquivos = coletar_entradas(args.entradas)
+    if not arquivos:
+        print("Nenhuma lista de material encontrada nas entradas.", file=sys.stderr)
+        return 2
+
+    # Com várias listas separadas, --saida é uma pasta; nos demais casos é o arquivo gerado
+    saida_unica = args.combinado or len(arquivos) == 1
+    pasta_saida = None
+    caminho_saida = None
+    if args.saida and saida_unica:
+        caminho_saida = args.saida
+    elif args.saida:
+        pasta_saida = args.saida
+        os.makedirs(pasta_saida, exist_ok=True)
+
+    # Com AUT_LISTA_RASTREIO, as etapas são medidas e o rastreio vai para um JSON (ver rastreamento.py)
+    import rastreamento
+    opcoes_rastreio = rastreamento.opcoes_do_ambiente()
+    rastreio = rastreamento.rastrear(**opcoes_rastreio) if opcoes_rastreio else contextlib.nullcontext({})
+
+    # As mensagens de progresso do processor vão para stderr para não misturar com o JSON
+    with contextlib.redirect_stdout(sys.stderr), rastreio as resultado_rastreio:
+        resumo = _processar_via_servico(args, arquivos, pasta_saida, caminho_saida) if args.servico else None
+        via_servico = resumo is not None
+        if not via_servico:
+            from lote import processar_lote
+
+            resumo = processar_lote(arquivos, args.template, pasta_saida=pasta_saida, combinado=args.combinado,
+                                    processos=args.jobs, motor=args.engine, caminho_saida=caminho_saida,
+                                    incremental=args.incremental, agrupar=args.agrupar, tamanho_bloco=args.chunk,
+                                    usar_cache=not args.sem_cache)
+
+    if resultado_rastreio:
+        print("\n".join(rastreamento.linhas_resumo(resultado_rastreio)), file=sys.stderr)
+
+    relatorio = {
+        "template": args.template,
+        "motor": args.engine,
+        "combinado": args.combinado,
+        "incremental": args.incremental,
+        "agrupado": args.agrupar,
+        "servico": args.servico if via_servico else None,
+        "rastreio": resultado_rastreio.get("arquivo"),
+        "arquivos": [_item_relatorio(item) for item in resumo],
+        "tempo_total_ms": (time.perf_counter() - inicio) * 1000,
+    }
+    texto = json.dumps(relatorio, ensure_ascii=False, indent=2)
+    if args.relatorio == "-":
+        print(texto)
+    else:
+        with open(args.relatorio, "w", encoding="utf-8") as arquivo:
+            arquivo.write(texto)
+
+    return 1 if any(item["erro"] for item in resumo) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+import sys
+from array import array
+
+from processor import (PERFIL_NAO_IDENTIFICADO, classificar_varios, converter_colunas_numericas, normalizar_nome_perfil_w,
+                       parse_dimensoes_inteligente)
+from rastreamento import trecho
+
+# ==============================================================================
+# LISTA DE MATERIAIS EM COLUNAS
+# ==============================================================================
+# Em vez de uma lista de listas [perfil, aço, l_total_m, peso], os itens ficam em
+# colunas: textos internados (perfil, aço, código, tipo) e array('d') para os
+# números. Classificação e dimensões são calculadas uma vez, na montagem, e o
+# planejamento, os agrupamentos e os totais percorrem as colunas diretamente.
+
+class ListaMateriais:
+    """
+    Itens extraídos de uma lista do MCalc, em colunas.
+    Continua se comportando como a lista de [perfil, aço, l_total_m, peso] que o resto
+    do código espera: len(), iteração, lista[i] e fatias (lista[i:j], uma list) devolvem os
+    itens nesse formato, e == compara com listas ou tuplas de itens. Para json.dumps e
+    afins, que só aceitam list, use para_lista().
+    """
+    __slots__ = ('perfis', 'acos', 'comprimentos', 'pesos', 'codigos', 'tipos',
+                 'dim_a', 'dim_b', 'dim_c', 'dim_esp', 'usou_descricao')
+
+    def __init__(self):
+        self.perfis = []
+        self.acos = []
+        self.comprimentos = array('d')
+        self.pesos = array('d')
+        self.codigos = []
+        self.tipos = []
+        self.dim_a = array('d')
+        self.dim_b = array('d')
+        self.dim_c = array('d')
+        self.dim_esp = array('d')
+        # 1 quando o comprimento veio da descrição (coluna L total vazia, zero ou inválida)
+        self.usou_descricao = array('B')
+
+    @classmethod
+    def de_registros(cls, registros):
+        """Monta as colunas a partir de itens [perfil, aço, l_total_m, peso] (lista ou gerador)."""
+        lista = cls()
+        for perfil, aco, l_total_m, peso in registros:
+            lista.perfis.append(sys.intern(perfil))
+            lista.acos.append(sys.intern(aco))
+            lista.comprimentos.append(l_total_m)
+            lista.pesos.append(peso)
+        lista.usou_descricao = array('B', bytes(len(lista.perfis)))
+        lista._classificar()
+        return lista
+
+    @classmethod
+    def de_linhas(cls, linhas):
+        """
+        Monta as colunas a partir das linhas em texto (perfil, aço, L total em cm, peso) dos leitores,
+        convertendo as colunas de comprimento e peso de uma vez (converter_colunas_numericas).
+        """
+        lista = cls()
+        ltotais, pesos = [], []
+        for perfil, aco, l_total, peso in linhas:
+            lista.perfis.append(sys.intern(perfil.strip()))
+            lista.acos.append(sys.intern(aco.strip()))
+            ltotais.append(l_total)
+            pesos.append(peso)
+        with trecho('conversao_colunas'):
+            lista.comprimentos, lista.pesos, lista.usou_descricao = converter_colunas_numericas(lista.perfis, ltotais, pesos)
+        with trecho('classificacao', itens=len(lista.perfis)):
+            lista._classificar()
+        return lista
+
+    @classmethod
+    def concatenar(cls, listas):
+        """Junta várias listas (na ordem recebida) numa só, sem reclassificar os itens."""
+        combinada = cls()
+        for lista in listas:
+            for coluna in cls.__slots__:
+                getattr(combinada, coluna).extend(getattr(lista, coluna))
+        return combinada
+
+    def _classificar(self):
+        """Preenche código, tipo e dimensões de todos os itens (uma passada)."""
+        codigos, tipos = classificar_varios(self.perfis)
+        self.codigos = [sys.intern(codigo) for codigo in codigos]
+        self.tipos = [sys.intern(tipo) for tipo in tipos]
+        for perfil, tipo in zip(self.perfis, tipos):
+            a, b, c, esp = parse_dimensoes_inteligente(perfil, tipo)
+            self.dim_a.append(a)
+            self.dim_b.append(b)
+            self.dim_c.append(c)
+            self.dim_esp.append(esp)
+
+    def __len__(self):
+        return len(self.perfis)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return list(map(list, zip(self.perfis[i], self.acos[i], self.comprimentos[i], self.pesos[i])))
+        return [self.perfis[i], self.acos[i], self.comprimentos[i], self.pesos[i]]
+
+    def __iter__(self):
+        return map(list, zip(self.perfis, self.acos, self.comprimentos, self.pesos))
+
+    def __eq__(self, outra):
+        if isinstance(outra, (ListaMateriais, list, tuple)):
+            return len(self) == len(outra) and all(
+                item == list(outro) for item, outro in zip(self, outra))
+        return NotImplemented
+
+    __hash__ = None
+
+    def para_lista(self):
+        """Os itens como list de [perfil, aço, l_total_m, peso] (serializável com json)."""
+        return list(self)
+
+    def itens_classificados(self):
+        """Gera (item, código, tipo, (a, b, c, esp)) sem reclassificar nem reextrair dimensões."""
+        return zip(self, self.codigos, self.tipos, zip(self.dim_a, self.dim_b, self.dim_c, self.dim_esp))
+
+    def totais_por_codigo(self):
+        """{código: (comprimento total em m, peso total)} numa passada pelas colunas."""
+        totais = {}
+        for codigo, comprimento, peso in zip(self.codigos, self.comprimentos, self.pesos):
+            soma_comprimento, soma_peso = totais.get(codigo, (0.0, 0.0))
+            totais[codigo] = (soma_comprimento + comprimento, soma_peso + peso)
+        return totais
+
+    def linhas_comprimento_da_descricao(self):
+        """Posições dos itens cujo comprimento foi extraído da descrição."""
+        return [i for i, flag in enumerate(self.usou_descricao) if flag]
+
+    def indices_por_codigo(self):
+        """{código: [posições dos itens]} na ordem da lista."""
+        grupos = {}
+        for i, codigo in enumerate(self.codigos):
+            grupos.setdefault(codigo, []).append(i)
+        return grupos
+
+    def chaves_agregacao(self):
+        """
+        Chave de cada item para a agregação: itens com a mesma chave gravariam as mesmas colunas
+        na mesma linha do template, a menos do comprimento e do peso.
+        - Viga W: nome normalizado (mesma linha do template) e aço.
+        - Demais perfis identificados: código, tipo, dimensões, aço e se é CA (comprimento dobrado).
+        - Não identificados: a descrição em maiúsculas, sem espaços repetidos, e o aço.
+        """
+        chaves = []
+        for i, (perfil, aco, codigo, tipo) in enumerate(zip(self.perfis, self.acos, self.codigos, self.tipos)):
+            if tipo == 'VIGA_W':
+                chaves.append((tipo, normalizar_nome_perfil_w(perfil), aco))
+            elif (codigo, tipo) == PERFIL_NAO_IDENTIFICADO:
+                chaves.append((tipo, " ".join(perfil.upper().split()), aco))
+            else:
+                dimensoes = (self.dim_a[i], self.dim_b[i], self.dim_c[i], self.dim_esp[i])
+                chaves.append((tipo, codigo, dimensoes, aco, 'CA ' in perfil.upper()))
+        return chaves
+
+    def agregar(self):
+        """
+        Junta os itens repetidos (mesma chave_agregacao) somando comprimentos e pesos.
+        Retorna (ListaMateriais com um item por perfil distinto, na ordem da primeira ocorrência,
+        [posições dos itens de origem de cada item agregado]). A descrição e as dimensões
+        do item agregado são as da primeira ocorrência.
+        """
+        agregada = ListaMateriais()
+        posicoes = {}
+        origens = []
+        for i, chave in enumerate(self.chaves_agregacao()):
+            j = posicoes.get(chave)
+            if j is None:
+                posicoes[chave] = len(origens)
+                origens.append([i])
+                for coluna in self.__slots__:
+                    getattr(agregada, coluna).append(getattr(self, coluna)[i])
+                continue
+            origens[j].append(i)
+            agregada.comprimentos[j] += self.comprimentos[i]
+            agregada.pesos[j] += self.pesos[i]
+            agregada.usou_descricao[j] |= self.usou_descricao[i]
+        return agregada, origens
@@ -0,0 +1,149 @@
+import csv
+import io
+import zipfile
+
+from rastreamento import trecho
+
+# ==============================================================================
+# REGISTRO DE LEITORES DE ENTRADA
+# ==============================================================================
+# Cada formato exportado pelo MCalc tem um leitor registrado aqui. O formato é
+# reconhecido pelos primeiros bytes do arquivo (não pela extensão) e o leitor
+# gera, uma a uma, as linhas da lista como textos (perfil, aço, l_total, peso).
+# A conversão dos valores fica no processor; um formato novo só mexe neste arquivo.
+
+# Assinaturas (bytes iniciais) -> formato, verificadas na ordem
+ASSINATURAS = [
+    (b"PK\x03\x04", "docx"),
+    (b"{\\rtf", "rtf"),
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "doc"),
+]
+TAMANHO_AMOSTRA = 2048
+
+# Padrões das colunas ausentes numa linha (mesmos da tabela do .docx)
+ACO_PADRAO = "A36"
+PESO_PADRAO = "0"
+
+LEITORES = {}
+
+def registrar_leitor(formato):
+    """Decorador: registra a função geradora que lê o 'formato' (substitui um leitor já registrado)."""
+    def registrar(funcao):
+        LEITORES[formato] = funcao
+        return funcao
+    return registrar
+
+def detectar_formato(caminho_arquivo):
+    """Formato do arquivo pelos bytes iniciais: 'docx', 'rtf', 'doc', 'texto' ou None se não reconhecido."""
+    with open(caminho_arquivo, "rb") as arquivo:
+        amostra = arquivo.read(TAMANHO_AMOSTRA)
+    # O Word às vezes grava o RTF com BOM ou espaços antes do '{'
+    inicio = amostra.lstrip(b"\xef\xbb\xbf \t\r\n")
+    for assinatura, formato in ASSINATURAS:
+        if inicio.startswith(assinatura):
+            # 'PK' é qualquer zip (.xlsx, .zip...): só é .docx se tiver o documento do Word
+            if formato == "docx" and not _documento_word(caminho_arquivo):
+                return None
+            return formato
+    if amostra and b"\x00" not in amostra:
+        return "texto"
+    return None
+
+def _documento_word(caminho_arquivo):
+    """O zip tem 'word/document.xml'? (só o índice do zip é lido)"""
+    try:
+        with zipfile.ZipFile(caminho_arquivo) as pacote:
+            return "word/document.xml" in pacote.namelist()
+    except (zipfile.BadZipFile, OSError):
+        return False
+
+def ler_linhas(caminho_arquivo, leitor="lxml"):
+    """
+    Gera as linhas da lista (perfil, aço, l_total, peso), como texto, usando o leitor
+    registrado para o formato detectado. 'leitor' escolhe a biblioteca do .docx
+    ('lxml' ou 'python-docx'); sem o lxml instalado, o python-docx é usado.
+    """
+    formato = detectar_formato(caminho_arquivo)
+    if formato == "doc":
+        raise ValueError("Arquivo .doc no formato binário do Word não é suportado: salve a lista como .docx ou .rtf.")
+    if formato not in LEITORES:
+        raise ValueError(f"Formato da lista de material não reconhecido: {caminho_arquivo}")
+    if formato == "docx":
+        return LEITORES[formato](caminho_arquivo, leitor)
+    return LEITORES[formato](caminho_arquivo)
+
+def linhas_da_tabela(celulas):
+    """
+    Gera as linhas a partir das 4 células da tabela do MCalc (uma linha por parágrafo).
+    Coluna de aço mais curta repete o primeiro aço; comprimento ausente fica vazio e peso ausente vira "0".
+    Tabelas com menos de 4 colunas são completadas com colunas vazias.
+    """
+    if celulas is None:
+        return
+    celulas = list(celulas[:4]) + [""] * (4 - len(celulas))
+    lista_perfis, lista_acos, lista_ltotais, lista_pesos = (
+        list(filter(None, texto.strip().split('\n'))) for texto in celulas
+    )
+    for i, perfil in enumerate(lista_perfis):
+        aco = lista_acos[i] if i < len(lista_acos) else (lista_acos[0] if lista_acos else ACO_PADRAO)
+        l_total = lista_ltotais[i] if i < len(lista_ltotais) else ""
+        peso = lista_pesos[i] if i < len(lista_pesos) else PESO_PADRAO
+        yield perfil, aco, l_total, peso
+
+@registrar_leitor("docx")
+def ler_docx(caminho_arquivo, leitor="lxml"):
+    if leitor == "lxml":
+        try:
+            from leitores import ler_celulas_docx
+        except ImportError:
+            leitor = "python-docx"
+    if leitor == "lxml":
+        celulas = ler_celulas_docx(caminho_arquivo)
+    elif leitor == "python-docx":
+        celulas = _ler_celulas_python_docx(caminho_arquivo)
+    else:
+        raise ValueError(f"Leitor de Word desconhecido: {leitor}")
+    yield from linhas_da_tabela(celulas)
+
+def _ler_celulas_python_docx(caminho_arquivo_word):
+    """Textos da 2ª linha da 1ª tabela via python-docx (caminho original, mais lento)."""
+    import docx
+
+    with trecho('docx_abrir'):
+        documento = docx.Document(caminho_arquivo_word)
+    with trecho('tabela_ler', leitor='python-docx'):
+        try:
+            tabela = documento.tables[0]
+        except IndexError:
+            return None
+
+        if len(tabela.rows) < 2: return None
+        return [tabela.cell(1, coluna).text for coluna in range(4)]
+
+@registrar_leitor("rtf")
+def ler_rtf(caminho_arquivo):
+    from leitor_rtf import ler_celulas_rtf
+    with trecho('tabela_ler', leitor='rtf'):
+        celulas = ler_celulas_rtf(caminho_arquivo)
+    yield from linhas_da_tabela(celulas)
+
+@registrar_leitor("texto")
+def ler_texto(caminho_arquivo):
+    """
+    Listas exportadas como CSV/TXT: uma linha por perfil com perfil, aço, L total (cm) e peso,
+    separados por ';' ou tabulação. Um cabeçalho começando com 'Perfil' é ignorado.
+    """
+    with open(caminho_arquivo, "rb") as arquivo:
+        conteudo = arquivo.read()
+    try:
+        texto = conteudo.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        texto = conteudo.decode("cp1252", "replace")
+
+    delimitador = "\t" if texto.count("\t") > texto.count(";") else ";"
+    for campos in csv.reader(io.StringIO(texto), delimiter=delimitador):
+        campos = [campo.strip() for campo in campos]
+        if not campos or not campos[0] or campos[0].lower().startswith("perfil"):
+            continue
+        campos += [""] * (4 - len(campos))
+        yield campos[0], campos[1] or ACO_PADRAO, campos[2], campos[3] or PESO_PADRAO
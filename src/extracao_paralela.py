@@ -0,0 +1,62 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from processor import extrair_dados_word
+
+# ==============================================================================
+# EXTRAÇÃO PARALELA DAS LISTAS
+# ==============================================================================
+# Ler .docx/.rtf é trabalho de CPU (XML e regex) e extrair_dados_word depende só
+# do caminho do arquivo: as listas são distribuídas num pool de processos, em
+# blocos de vários arquivos por tarefa. O resultado de cada lista volta como
+# ListaMateriais (colunas em array e textos internados, que o pickle transporta
+# sem repetir as strings) e sai sempre na ordem dos arquivos de entrada.
+
+# Blocos por processo quando o tamanho do bloco não é informado (equilibra a carga
+# entre os processos sem pagar uma ida e volta ao pool por arquivo)
+BLOCOS_POR_PROCESSO = 4
+
+def _extrair_um(caminho_lista, leitor):
+    """Executado nos processos do pool: (dados, tempo em ms, mensagem de erro ou None)."""
+    inicio = time.perf_counter()
+    try:
+        dados = extrair_dados_word(caminho_lista, leitor)
+    except Exception as e:
+        # A mensagem, e não a exceção, volta ao processo principal: nem toda exceção é serializável
+        return None, (time.perf_counter() - inicio) * 1000, str(e) or type(e).__name__
+    return dados, (time.perf_counter() - inicio) * 1000, None
+
+def _extrair_bloco(caminhos, leitor):
+    return [_extrair_um(caminho, leitor) for caminho in caminhos]
+
+def numero_de_processos(processos, arquivos):
+    """Processos usados: 'processos' (padrão: nº de núcleos), nunca mais que o nº de arquivos."""
+    return max(1, min(processos or os.cpu_count() or 1, len(arquivos)))
+
+def extrair_listas(arquivos, processos=None, tamanho_bloco=None, leitor='lxml'):
+    """
+    Extrai várias listas e devolve [(dados, extracao_ms, erro)] na ordem de 'arquivos',
+    qualquer que seja a ordem em que os processos terminam.
+    - processos: nº de processos do pool (padrão: nº de núcleos). Com 1 processo, ou uma
+      única lista, a extração é feita neste processo, sem o custo de subir o pool.
+    - tamanho_bloco: arquivos por tarefa enviada ao pool (padrão: divide os arquivos em
+      BLOCOS_POR_PROCESSO blocos por processo).
+    - erro: None, ou a mensagem da exceção lançada na leitura daquela lista.
+    Se o pool não puder ser criado (ambiente sem suporte a multiprocessing), a extração
+    é feita neste processo.
+    """
+    arquivos = list(arquivos)
+    processos = numero_de_processos(processos, arquivos)
+    if processos == 1:
+        return _extrair_bloco(arquivos, leitor)
+
+    tamanho_bloco = tamanho_bloco or max(1, -(-len(arquivos) // (processos * BLOCOS_POR_PROCESSO)))
+    blocos = [arquivos[i:i + tamanho_bloco] for i in range(0, len(arquivos), tamanho_bloco)]
+    try:
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            # map devolve os blocos na ordem de envio
+            resultados = executor.map(_extrair_bloco, blocos, [leitor] * len(blocos))
+            return [resultado for bloco in resultados for resultado in bloco]
+    except (OSError, NotImplementedError):
+        return _extrair_bloco(arquivos, leitor)
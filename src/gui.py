@@ -1,20 +1,45 @@
+import time
+
+# Início do script, antes dos demais imports (tempos de inicialização: ver inicializacao.py)
+INICIO_SCRIPT = time.perf_counter()
+
 import os
+import queue
 import sys
+import threading
 import tkinter as tk
-from tkinter import filedialog, messagebox
+from tkinter import filedialog, messagebox, ttk
 from tkinter.scrolledtext import ScrolledText
 
 # Adiciona o diretório raiz do projeto ao sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 #import utils
 
-from processor import extrair_dados_word, preencher_planilha_excel
+# O processor (openpyxl, lxml) é importado em segundo plano depois que a janela aparece: ver aquecimento.py
+import aquecimento
+import inicializacao
+import rastreamento
+
+FIM_IMPORTS = time.perf_counter()
+
+# Intervalo (ms) entre as leituras da fila de progresso do processamento
+INTERVALO_FILA_MS = 50
+
+NOMES_ETAPAS = {
+    'extracao': "Lendo a lista",
+    'leitura_template': "Lendo a planilha",
+    'planejamento': "Preenchendo itens",
+    'gravacao': "Salvando a planilha",
+}
+
+class AutomacaoCancelada(Exception):
+    """Lançada dentro da thread de processamento quando o usuário clica em 'Cancelar'."""
 
 class DocxToExcelAutomator:
     def __init__(self, root):
         self.root = root
         self.root.title("Aut Lista de Material - DOCX to Excel Automator")
-        self.root.geometry("600x400")
+        self.root.geometry("600x430")
 
         # File selection frame
         file_frame = tk.Frame(root, padx=10, pady=10)
@@ -22,7 +47,7 @@ class DocxToExcelAutomator:
 
         # DOCX file selection
         self.docx_path = tk.StringVar()
-        docx_label = tk.Label(file_frame, text="Lista de Material (.docx):")
+        docx_label = tk.Label(file_frame, text="Lista de Material (.docx / .rtf):")
         docx_label.grid(row=0, column=0, sticky=tk.W, pady=(0, 5))
 
         self.docx_entry = tk.Entry(file_frame, textvariable=self.docx_path, width=70)
@@ -44,9 +69,41 @@ class DocxToExcelAutomator:
 
         file_frame.grid_columnconfigure(0, weight=1)
 
-        # Start button
-        self.start_button = tk.Button(root, text="Iniciar Script", command=self.start_automation, font=("Helvetica", 12, "bold"))
-        self.start_button.pack(pady=10, padx=10, fill=tk.X, ipady=5)
+        # Rastreamento das etapas (começa como em AUT_LISTA_RASTREIO)
+        opcoes_rastreio = rastreamento.opcoes_do_ambiente()
+        self.rastrear = tk.BooleanVar(value=opcoes_rastreio is not None)
+        self.perfilar = tk.BooleanVar(value=bool(opcoes_rastreio and (opcoes_rastreio['perfil'] or opcoes_rastreio['memoria'])))
+        trace_frame = tk.Frame(root, padx=10)
+        trace_frame.pack(fill=tk.X)
+        tk.Checkbutton(trace_frame, text="Medir etapas", variable=self.rastrear).pack(side=tk.LEFT)
+        tk.Checkbutton(trace_frame, text="Com perfil (cProfile e memória)", variable=self.perfilar).pack(side=tk.LEFT)
+
+        # Start / cancel buttons
+        button_frame = tk.Frame(root, padx=10)
+        button_frame.pack(fill=tk.X, pady=10)
+
+        self.start_button = tk.Button(button_frame, text="Iniciar Script", command=self.start_automation, font=("Helvetica", 12, "bold"))
+        self.start_button.pack(side=tk.LEFT, fill=tk.X, expand=True, ipady=5)
+
+        self.cancel_button = tk.Button(button_frame, text="Cancelar", command=self.cancel_automation, state='disabled')
+        self.cancel_button.pack(side=tk.LEFT, padx=(5, 0), ipady=5)
+
+        # Progress
+        progress_frame = tk.Frame(root, padx=10)
+        progress_frame.pack(fill=tk.X)
+
+        self.progress_bar = ttk.Progressbar(progress_frame, mode='determinate')
+        self.progress_bar.pack(fill=tk.X)
+
+        self.progress_text = tk.StringVar()
+        progress_label = tk.Label(progress_frame, textvariable=self.progress_text, anchor=tk.W)
+        progress_label.pack(fill=tk.X)
+
+        # Estado do processamento em segundo plano
+        self.fila = queue.Queue()
+        self.cancelar = threading.Event()
+        self.worker = None
+        self.inicio = 0.0
 
         # Log frame
         log_frame = tk.Frame(root, padx=10, pady=10)
@@ -84,21 +141,23 @@ class DocxToExcelAutomator:
         self.log_text.insert(tk.END, message + "\n")
         self.log_text.config(state='disabled')
         self.log_text.see(tk.END)
-        self.root.update_idletasks()
 
     def browse_docx_file(self):
+        aquecimento.iniciar()
         filepath = filedialog.askopenfilename(
-            title="Selecione um arquivo DOCX",
-            filetypes=(("Word Documents", "*.docx"), ("All files", "*.*"))
+            title="Selecione a lista de material",
+            filetypes=(("Listas do MCalc", "*.docx *.rtf *.rtf.doc *.csv *.txt"), ("Word Documents", "*.docx"),
+                       ("RTF", "*.rtf *.rtf.doc"), ("CSV / Texto", "*.csv *.txt"), ("All files", "*.*"))
         )
         if filepath:
             self.docx_path.set(filepath)
-            self.log(f"Arquivo DOCX selecionado: {os.path.basename(filepath)}")
+            self.log(f"Lista de material selecionada: {os.path.basename(filepath)}")
             # Clear focus to trigger placeholder logic if entry is cleared and refocused
             self.root.focus()
 
 
     def browse_excel_file(self):
+        aquecimento.iniciar()
         filepath = filedialog.askopenfilename(
             title="Selecione um arquivo Excel",
             filetypes=(("Excel Spreadsheets", "*.xlsx"), ("All files", "*.*"))
@@ -115,7 +174,7 @@ class DocxToExcelAutomator:
 
         # Validate that the fields are not empty or with placeholder text
         if not arquivo_word or "selecionar a lista de material" in arquivo_word:
-            messagebox.showerror("Erro", "Por favor, selecione um arquivo .docx primeiro.")
+            messagebox.showerror("Erro", "Por favor, selecione a lista de material (.docx ou .rtf) primeiro.")
             return
 
         if not planilha_excel or "selecionar a planilha de aço" in planilha_excel:
@@ -127,22 +186,166 @@ class DocxToExcelAutomator:
             return
 
         self.log("Iniciando o processo...")
-        
+        self.set_running(True)
+        self.cancelar.clear()
+        self.inicio = time.perf_counter()
+        # As variáveis do Tk são lidas aqui, na thread da interface
+        rastreio = None
+        if self.rastrear.get() or self.perfilar.get():
+            rastreio = {'perfil': self.perfilar.get(), 'memoria': self.perfilar.get()}
+        self.worker = threading.Thread(target=self.run_automation, args=(arquivo_word, planilha_excel, rastreio),
+                                       daemon=True)
+        self.worker.start()
+        self.root.after(INTERVALO_FILA_MS, self.poll_queue)
+
+    def cancel_automation(self):
+        self.cancelar.set()
+        self.cancel_button.config(state='disabled')
+        self.log("Cancelando...")
+
+    def set_running(self, running):
+        """Bloqueia os botões enquanto há um processamento em andamento."""
+        state = 'disabled' if running else 'normal'
+        for button in (self.start_button, self.browse_docx_button, self.browse_excel_button):
+            button.config(state=state)
+        self.cancel_button.config(state='normal' if running else 'disabled')
+        if running:
+            self.progress_bar['value'] = 0
+            self.progress_text.set("")
+
+    def report_progress(self, etapa, atual, total):
+        """Chamada pela thread de processamento: publica o progresso e atende o cancelamento."""
+        if self.cancelar.is_set():
+            raise AutomacaoCancelada()
+        self.fila.put(('progresso', etapa, atual, total, (time.perf_counter() - self.inicio) * 1000))
+
+    def run_automation(self, arquivo_word, planilha_excel, rastreio=None):
+        """
+        Executa extração e preenchimento fora da thread do Tk; toda a comunicação passa pela fila.
+        rastreio: opções de rastreamento.rastrear ({'perfil', 'memoria'}), ou None para não rastrear.
+        """
         try:
-            dados_extraidos = extrair_dados_word(arquivo_word)
-            if dados_extraidos:
-                self.log(f"Dados extraídos de {os.path.basename(arquivo_word)} com sucesso.")
-                self.log("Preenchendo a planilha Excel...")
-                preencher_planilha_excel(planilha_excel, dados_extraidos)
-                messagebox.showinfo("Sucesso", "A planilha Excel foi atualizada com sucesso.")
+            if self.run_via_servico(arquivo_word, planilha_excel):
+                return
+            if not aquecimento.pronto():
+                self.fila.put(('log', "Carregando bibliotecas..."))
+            processor = aquecimento.processor()
+            if rastreio:
+                resultado = {}
+                try:
+                    with rastreamento.rastrear(**rastreio) as resultado:
+                        caminho = self.run_local(processor, arquivo_word, planilha_excel)
+                finally:
+                    # Também quando o processamento falha ou é cancelado: o rastreio mostra onde parou
+                    if resultado:
+                        for linha in rastreamento.linhas_resumo(resultado):
+                            self.fila.put(('log', linha))
             else:
-                self.log("Nenhum dado extraído do arquivo Word. Verifique o arquivo.")
-                messagebox.showwarning("Aviso", "Nenhum dado foi extraído do arquivo Word. Por favor, verifique o arquivo.")
+                caminho = self.run_local(processor, arquivo_word, planilha_excel)
+            if caminho:
+                self.fila.put(('sucesso', caminho))
+        except AutomacaoCancelada:
+            self.fila.put(('cancelado',))
         except Exception as e:
-            self.log(f"Erro: {e}")
-            messagebox.showerror("Erro na Automação", f"Ocorreu um erro: {e}")
+            self.fila.put(('erro', e))
+
+    def run_local(self, processor, arquivo_word, planilha_excel):
+        """Extrai a lista e preenche a planilha neste processo; retorna o arquivo gerado, ou None se a lista veio vazia."""
+        dados_extraidos = processor.extrair_dados_word(arquivo_word, progresso=self.report_progress)
+        if not dados_extraidos:
+            self.fila.put(('aviso', "Nenhum dado extraído do arquivo Word. Verifique o arquivo."))
+            return None
+        self.fila.put(('log', f"Dados extraídos de {os.path.basename(arquivo_word)} com sucesso."))
+        self.fila.put(('log', "Preenchendo a planilha Excel..."))
+        return processor.preencher_planilha_excel(planilha_excel, dados_extraidos, progresso=self.report_progress)
+
+    def run_via_servico(self, arquivo_word, planilha_excel):
+        """Com AUT_LISTA_SERVICO, envia o trabalho ao serviço local. False se ele não respondeu."""
+        import servico
+
+        endereco = servico.endereco_configurado()
+        if not endereco:
+            return False
+        self.fila.put(('log', f"Enviando ao serviço {endereco}..."))
+        cliente = servico.ClienteServico(endereco)
+        try:
+            caminho = cliente.preencher(arquivo_word, planilha_excel)
+        except ConnectionError as e:
+            self.fila.put(('log', f"Serviço indisponível ({e}): processando localmente."))
+            return False
+        finally:
+            cliente.fechar()
+        self.fila.put(('sucesso', caminho))
+        return True
+
+    def poll_queue(self):
+        """Lê as mensagens da thread de processamento (via root.after) e atualiza a janela."""
+        fim = None
+        try:
+            while True:
+                mensagem = self.fila.get_nowait()
+                if mensagem[0] == 'progresso':
+                    self.show_progress(*mensagem[1:])
+                elif mensagem[0] == 'log':
+                    self.log(mensagem[1])
+                else:
+                    fim = mensagem
+        except queue.Empty:
+            pass
+
+        if fim is None:
+            self.root.after(INTERVALO_FILA_MS, self.poll_queue)
+            return
+        self.finish_automation(fim)
+
+    def show_progress(self, etapa, atual, total, decorrido_ms):
+        nome = NOMES_ETAPAS.get(etapa, etapa)
+        if total:
+            self.progress_bar['maximum'] = total
+            self.progress_bar['value'] = atual
+        if total > 1:
+            self.progress_text.set(f"{nome}: item {atual}/{total} ({decorrido_ms:.0f} ms)")
+        elif atual and not total:
+            # Total ainda desconhecido (a lista é lida item a item)
+            self.progress_text.set(f"{nome}: item {atual} ({decorrido_ms:.0f} ms)")
+        else:
+            self.progress_text.set(f"{nome}... ({decorrido_ms:.0f} ms)")
+
+    def finish_automation(self, mensagem):
+        self.set_running(False)
+        self.worker = None
+        decorrido_ms = (time.perf_counter() - self.inicio) * 1000
+        tipo = mensagem[0]
+        if tipo == 'sucesso':
+            self.progress_text.set(f"Concluído em {decorrido_ms:.0f} ms")
+            self.log(f"Planilha gerada: {os.path.basename(mensagem[1])}")
+            messagebox.showinfo("Sucesso", "A planilha Excel foi atualizada com sucesso.")
+        elif tipo == 'aviso':
+            self.progress_text.set("")
+            self.log(mensagem[1])
+            messagebox.showwarning("Aviso", "Nenhum dado foi extraído do arquivo Word. Por favor, verifique o arquivo.")
+        elif tipo == 'cancelado':
+            self.progress_text.set("Cancelado")
+            self.log("Processo cancelado pelo usuário.")
+        else:
+            self.progress_text.set("")
+            self.log(f"Erro: {mensagem[1]}")
+            messagebox.showerror("Erro na Automação", f"Ocorreu um erro: {mensagem[1]}")
+
+    def registrar_inicio(self):
+        """Chamado quando a janela termina de aparecer: registra e mostra os tempos de inicialização."""
+        tempos = inicializacao.registrar(inicializacao.medir_tempos(INICIO_SCRIPT, FIM_IMPORTS))
+        self.log(f"Aberto em {tempos['total_ms']:.0f} ms (imports {tempos['imports_ms']:.0f} ms,"
+                 f" janela {tempos['janela_ms']:.0f} ms)")
+        if inicializacao.somente_medir():
+            self.root.destroy()
+            return
+        # Janela já visível: importa o processor enquanto o usuário escolhe os arquivos
+        aquecimento.iniciar()
 
 if __name__ == "__main__":
     root = tk.Tk()
     app = DocxToExcelAutomator(root)
+    # after_idle roda depois dos redesenhos pendentes, ou seja, com a janela já visível
+    root.after_idle(app.registrar_inicio)
     root.mainloop()
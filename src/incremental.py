@@ -0,0 +1,161 @@
+import difflib
+import hashlib
+import json
+import os
+import time
+
+import motor_xlsx
+from cache_template import chave_template
+from processor import (estado_linhas_ocultas, faixas_de_linhas, indexar_template, nome_arquivo_processado,
+                       planejar_preenchimento)
+
+# ==============================================================================
+# PREENCHIMENTO INCREMENTAL
+# ==============================================================================
+# Ao lado de cada '_processado.xlsx' fica um JSON com o hash de cada registro da
+# lista e o plano gravado. Quando a mesma estrutura é reexportada do MCalc com
+# poucas mudanças, o plano novo é comparado com o anterior e só as células que
+# mudaram são regravadas no arquivo já gerado (motor 'patch'). Células que saíram
+# do plano voltam ao valor do template e só as linhas que mudaram de estado são
+# ocultadas ou reexibidas.
+
+# Mudou o formato do estado? Incremente para forçar a regravação completa.
+VERSAO_ESTADO = 1
+SUFIXO_ESTADO = ".registros.json"
+
+def caminho_estado(caminho_saida):
+    """Arquivo de estado ao lado da planilha gerada: '<saida>.registros.json'."""
+    return os.path.splitext(caminho_saida)[0] + SUFIXO_ESTADO
+
+def hash_registro(item):
+    """Hash curto de um item [perfil, aço, l_total_m, peso]."""
+    return hashlib.blake2b(repr(tuple(item)).encode("utf-8"), digest_size=8).hexdigest()
+
+def _impressao_saida(caminho_saida):
+    informacoes = os.stat(caminho_saida)
+    return [informacoes.st_size, informacoes.st_mtime_ns]
+
+def _ler_estado(caminho_planilha, caminho_saida):
+    """
+    Estado da última gravação, ou None se não houver, se o template mudou ou se a planilha
+    gerada foi alterada por fora (aberta e salva no Excel, por exemplo) desde então.
+    """
+    try:
+        with open(caminho_estado(caminho_saida), encoding="utf-8") as arquivo:
+            estado = json.load(arquivo)
+        impressao = _impressao_saida(caminho_saida)
+    except (OSError, ValueError):
+        return None
+    if (estado.get("versao") != VERSAO_ESTADO or estado.get("saida") != impressao
+            or estado.get("template") != chave_template(caminho_planilha)):
+        return None
+    estado["plano"] = {linha: dict(gravacoes) for linha, gravacoes in estado["plano"]}
+    return estado
+
+def _salvar_estado(caminho_planilha, caminho_saida, registros, plano):
+    destino = caminho_estado(caminho_saida)
+    temporario = f"{destino}.{os.getpid()}.tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump({
+            "versao": VERSAO_ESTADO,
+            "template": chave_template(caminho_planilha),
+            "saida": _impressao_saida(caminho_saida),
+            "registros": registros,
+            "plano": [[linha, list(gravacoes.items())] for linha, gravacoes in plano.items()],
+        }, arquivo, ensure_ascii=False, separators=(",", ":"))
+    os.replace(temporario, destino)
+
+def registros_alterados(anteriores, atuais):
+    """Quantos registros entraram, saíram ou mudaram entre duas listas de hashes (na ordem da lista)."""
+    comparacao = difflib.SequenceMatcher(None, anteriores, atuais, autojunk=False)
+    return sum(max(fim_a - inicio_a, fim_b - inicio_b)
+               for operacao, inicio_a, fim_a, inicio_b, fim_b in comparacao.get_opcodes() if operacao != "equal")
+
+def diferencas_plano(plano_anterior, plano_atual):
+    """
+    Células a regravar para ir do plano anterior ao atual: ({linha: {coluna: valor}} novos ou alterados,
+    [(linha, coluna)] que saíram do plano e devem voltar ao valor do template).
+    """
+    gravacoes = {}
+    for linha, atuais in plano_atual.items():
+        anteriores = plano_anterior.get(linha, {})
+        mudancas = {coluna: valor for coluna, valor in atuais.items()
+                    if coluna not in anteriores or anteriores[coluna] != valor}
+        if mudancas:
+            gravacoes[linha] = mudancas
+    restaurar = [(linha, coluna) for linha, anteriores in plano_anterior.items()
+                 for coluna in anteriores if coluna not in plano_atual.get(linha, {})]
+    return gravacoes, restaurar
+
+def atualizar_planilha(caminho_planilha, dados_materiais, caminho_saida=None, indice=None, relatorio=None, usar_cache=True):
+    """
+    Preenche o template como preencher_planilha_excel (motor 'patch'), mas reaproveita a planilha
+    já gerada: se o estado salvo da última execução ainda vale, só as células e linhas afetadas
+    pelos registros que mudaram são regravadas no arquivo existente.
+    Sem estado válido (primeira execução, template ou saída alterados por fora) a planilha é gerada
+    por completo a partir do template, e o estado é salvo para as próximas execuções.
+    relatorio: dict opcional que recebe 'modo' ('completo', 'incremental' ou 'sem_alteracoes'),
+    'registros_alterados', 'linhas_preenchidas', 'linhas_regravadas', 'itens_sem_linha', 'faixas_ocultas'
+    e 'tempos_ms'.
+    usar_cache=False lê sempre a estrutura do template (sem 'indice'), sem passar pelo cache de templates.
+    Retorna o caminho do arquivo gerado.
+    """
+    caminho_processado = nome_arquivo_processado(caminho_planilha, caminho_saida)
+    tempos = {}
+    inicio = time.perf_counter()
+
+    if not hasattr(dados_materiais, "__len__"):
+        dados_materiais = list(dados_materiais)
+    registros = [hash_registro(item) for item in dados_materiais]
+    estado = _ler_estado(caminho_planilha, caminho_processado)
+    indice = indice.copiar() if indice else indexar_template(caminho_planilha, usar_cache)
+    tempos['leitura_template'] = (time.perf_counter() - inicio) * 1000
+
+    inicio = time.perf_counter()
+    itens_sem_linha = []
+    plano = planejar_preenchimento(indice, dados_materiais, itens_sem_linha)
+    ocultas = estado_linhas_ocultas(indice, plano)
+    gravacoes, ocultas_alteradas = plano, ocultas
+    if estado is None:
+        modo = 'completo'
+    elif estado["registros"] == registros:
+        modo = 'sem_alteracoes'
+        gravacoes, ocultas_alteradas = {}, {}
+    else:
+        modo = 'incremental'
+        gravacoes, restaurar = diferencas_plano(estado["plano"], plano)
+        originais = motor_xlsx.ler_celulas_template(caminho_planilha, restaurar)
+        if any(isinstance(valor, str) and valor.startswith("=") for valor in originais.values()):
+            # Fórmula do template não é regravada pelo patch: gera a planilha de novo
+            modo, gravacoes = 'completo', plano
+        else:
+            for (linha, coluna), valor in sorted(originais.items()):
+                gravacoes.setdefault(linha, {})[coluna] = valor
+            anteriores = estado_linhas_ocultas(indice, estado["plano"])
+            ocultas_alteradas = {linha: oculta for linha, oculta in ocultas.items() if anteriores.get(linha) != oculta}
+    tempos['planejamento'] = (time.perf_counter() - inicio) * 1000
+
+    inicio = time.perf_counter()
+    if modo == 'completo':
+        motor_xlsx.gravar_xlsx_patch(caminho_planilha, caminho_processado, plano, ocultas)
+    elif gravacoes or ocultas_alteradas:
+        temporario = f"{caminho_processado}.{os.getpid()}.tmp"
+        motor_xlsx.gravar_xlsx_patch(caminho_processado, temporario, gravacoes, ocultas_alteradas)
+        os.replace(temporario, caminho_processado)
+    if modo != 'sem_alteracoes':
+        _salvar_estado(caminho_planilha, caminho_processado, registros, plano)
+    tempos['gravacao'] = (time.perf_counter() - inicio) * 1000
+
+    if relatorio is not None:
+        relatorio['modo'] = modo
+        relatorio['registros_alterados'] = (len(registros) if estado is None
+                                            else registros_alterados(estado["registros"], registros))
+        relatorio['linhas_preenchidas'] = sorted(plano)
+        relatorio['linhas_regravadas'] = sorted(set(gravacoes) | set(ocultas_alteradas))
+        relatorio['itens_sem_linha'] = itens_sem_linha
+        relatorio['faixas_ocultas'] = [(primeira, ultima) for primeira, ultima, oculta in faixas_de_linhas(ocultas) if oculta]
+        relatorio['tempos_ms'] = tempos
+
+    print(f"\n[OK] Planilha atualizada ({modo}): {len(set(gravacoes) | set(ocultas_alteradas))} linha(s) regravada(s)")
+    print(f"[ARQUIVO] Gerado: {caminho_processado}")
+    return caminho_processado
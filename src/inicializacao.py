@@ -0,0 +1,95 @@
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+# ==============================================================================
+# TEMPOS DE INICIALIZAÇÃO DO APLICATIVO
+# ==============================================================================
+# A interface mede quanto tempo leva para abrir: do início do processo (inclui o
+# bootloader do PyInstaller e o interpretador) até o gui.py rodar, os imports e a
+# montagem da janela. Cada abertura vira uma linha de JSON num arquivo local, para
+# acompanhar regressões entre versões; src/medir_inicio.py usa o mesmo registro.
+
+# Linhas mantidas no arquivo de registro (as mais antigas são descartadas)
+LIMITE_REGISTROS = 200
+
+# Com esta variável de ambiente = "1", o aplicativo fecha assim que a janela aparece
+VARIAVEL_MEDIR = "AUT_LISTA_MEDIR_INICIO"
+
+def tempo_desde_criacao_processo_ms():
+    """Milissegundos desde que o sistema criou este processo, ou None se não der para saber."""
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            from ctypes import wintypes
+
+            criacao, saida, kernel, usuario, agora = (wintypes.FILETIME() for _ in range(5))
+            ctypes.windll.kernel32.GetProcessTimes(
+                ctypes.windll.kernel32.GetCurrentProcess(),
+                ctypes.byref(criacao), ctypes.byref(saida), ctypes.byref(kernel), ctypes.byref(usuario))
+            ctypes.windll.kernel32.GetSystemTimeAsFileTime(ctypes.byref(agora))
+            em_100ns = lambda tempo: (tempo.dwHighDateTime << 32) | tempo.dwLowDateTime
+            return (em_100ns(agora) - em_100ns(criacao)) / 10_000
+        with open("/proc/self/stat") as arquivo:
+            # O 2º campo (nome do executável) pode ter espaços: conta a partir do ')'
+            inicio_ticks = int(arquivo.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as arquivo:
+            uptime = float(arquivo.read().split()[0])
+        return (uptime - inicio_ticks / os.sysconf("SC_CLK_TCK")) * 1000
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+def arquivo_registro():
+    """Arquivo JSONL dos tempos: AUT_LISTA_INICIO, ou 'inicializacao.jsonl' ao lado do cache de templates."""
+    caminho = os.environ.get("AUT_LISTA_INICIO")
+    if caminho:
+        return caminho
+    from cache_template import pasta_cache_padrao
+    return os.path.join(os.path.dirname(pasta_cache_padrao()), "inicializacao.jsonl")
+
+def medir_tempos(inicio_script, fim_imports):
+    """
+    Tempos da abertura, medidos quando a janela termina de aparecer:
+    - processo_ms: do início do processo até o gui.py começar (bootloader, interpretador, descompactação);
+    - imports_ms: imports do gui.py;
+    - janela_ms: criação do Tk e montagem da janela;
+    - total_ms: do início do processo (ou do gui.py, se não disponível) até a janela visível.
+    """
+    agora = time.perf_counter()
+    desde_processo = tempo_desde_criacao_processo_ms()
+    desde_script = (agora - inicio_script) * 1000
+    return {
+        'processo_ms': None if desde_processo is None else max(desde_processo - desde_script, 0.0),
+        'imports_ms': (fim_imports - inicio_script) * 1000,
+        'janela_ms': (agora - fim_imports) * 1000,
+        'total_ms': desde_processo if desde_processo is not None else desde_script,
+    }
+
+def registrar(tempos):
+    """Acrescenta os tempos ao arquivo de registro. Falhas de escrita são ignoradas."""
+    registro = {
+        'data': datetime.now().isoformat(timespec="seconds"),
+        'executavel': bool(getattr(sys, "frozen", False)),
+        'python': sys.version.split()[0],
+        **tempos,
+    }
+    caminho = arquivo_registro()
+    try:
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        try:
+            with open(caminho, encoding="utf-8") as arquivo:
+                linhas = arquivo.readlines()[-(LIMITE_REGISTROS - 1):]
+        except OSError:
+            linhas = []
+        linhas.append(json.dumps(registro) + "\n")
+        with open(caminho, "w", encoding="utf-8") as arquivo:
+            arquivo.writelines(linhas)
+    except OSError:
+        pass
+    return registro
+
+def somente_medir():
+    """O aplicativo foi aberto só para medir a inicialização (ver src/medir_inicio.py)?"""
+    return os.environ.get(VARIAVEL_MEDIR) == "1"
@@ -0,0 +1,156 @@
+import re
+
+# ==============================================================================
+# LEITURA DA TABELA DO MCALC EM RTF (.RTF / .RTF.DOC)
+# ==============================================================================
+# O MCalc também exporta a lista em RTF. Em vez de converter no Word, lemos os
+# bytes do arquivo com um tokenizador: as células terminam em \cell e as linhas
+# em \row. Uma única passada, sem montar um modelo do documento, parando assim
+# que a linha pedida da primeira tabela termina.
+
+# \palavra[-N][espaço] | \'hh | \símbolo | { | } | texto | quebras de linha (ignoradas)
+REGEX_TOKEN = re.compile(
+    rb"\\([a-zA-Z]{1,32})(-?\d{1,10})? ?"
+    rb"|\\'([0-9a-fA-F]{2})"
+    rb"|\\([^a-zA-Z'])"
+    rb"|([{}])"
+    rb"|([^\\{}\r\n]+)"
+    rb"|[\r\n]+"
+)
+REGEX_SALTO_GRUPO = re.compile(rb"[{}\\]")
+
+# Grupos cujo conteúdo não é texto do documento (além dos marcados com \*)
+DESTINOS_IGNORADOS = frozenset((
+    b"fonttbl", b"colortbl", b"stylesheet", b"info", b"pict", b"object", b"header", b"headerl",
+    b"headerr", b"headerf", b"footer", b"footerl", b"footerr", b"footerf", b"footnote",
+    b"listtable", b"listoverridetable", b"rsidtbl", b"themedata", b"colorschememapping",
+    b"latentstyles", b"datastore", b"xmlnstbl", b"generator", b"fldinst",
+))
+
+# Palavras de controle que viram texto (mesmas conversões do leitor de .docx)
+TEXTO_CONTROLES = {
+    b"par": "\n", b"line": "\n", b"tab": "\t",
+    b"emdash": "\u2014", b"endash": "\u2013", b"bullet": "\u2022",
+    b"lquote": "\u2018", b"rquote": "\u2019", b"ldblquote": "\u201c", b"rdblquote": "\u201d",
+}
+TEXTO_SIMBOLOS = {b"\\": "\\", b"{": "{", b"}": "}", b"~": "\xa0", b"_": "-", b"\n": "\n", b"\r": "\n"}
+
+def _pular_grupo(dados, posicao):
+    """Posição logo após o '}' que fecha o grupo atual (respeita \\{, \\} e \\bin)."""
+    profundidade = 1
+    while profundidade:
+        achado = REGEX_SALTO_GRUPO.search(dados, posicao)
+        if not achado:
+            return len(dados)
+        caractere = achado.group()
+        posicao = achado.end()
+        if caractere == b"{":
+            profundidade += 1
+        elif caractere == b"}":
+            profundidade -= 1
+        else:
+            binario = re.match(rb"bin(\d+) ?", dados[posicao:posicao + 16])
+            posicao += binario.end() + int(binario.group(1)) if binario else 1
+    return posicao
+
+def ler_celulas_rtf(caminho_arquivo_rtf, indice_linha=1):
+    """
+    Devolve os textos das células da linha `indice_linha` da primeira tabela do RTF
+    (parágrafos da célula unidos por '\\n', como no .docx), ou None se não houver
+    tabela ou ela tiver menos linhas. Tabelas aninhadas (\\itap > 1) são ignoradas.
+    """
+    with open(caminho_arquivo_rtf, "rb") as arquivo:
+        dados = arquivo.read()
+
+    codificacao = "cp1252"
+    # Estado salvo a cada grupo: (nível da tabela do parágrafo, \ucN)
+    pilha = []
+    nivel, uc = 0, 1
+    pular_caracteres = 0
+    inicio_grupo = False
+
+    celulas, texto = [], []
+    linhas_lidas = 0
+
+    posicao, tamanho = 0, len(dados)
+    while posicao < tamanho:
+        token = REGEX_TOKEN.match(dados, posicao)
+        posicao = token.end()
+        if token.lastindex is None:
+            # Quebra de linha: não é token do RTF (e não pode desfazer o início de grupo de '{\r\n\*...')
+            continue
+        palavra, parametro, hexa, simbolo, chave, literal = token.groups()
+
+        if chave == b"{":
+            pilha.append((nivel, uc))
+            inicio_grupo = True
+            continue
+        if chave == b"}":
+            if pilha:
+                nivel, uc = pilha.pop()
+            inicio_grupo = False
+            continue
+
+        if inicio_grupo:
+            inicio_grupo = False
+            if simbolo == b"*" or palavra in DESTINOS_IGNORADOS:
+                posicao = _pular_grupo(dados, posicao)
+                if pilha:
+                    nivel, uc = pilha.pop()
+                continue
+
+        if palavra is not None:
+            if palavra == b"cell":
+                if nivel == 1:
+                    celulas.append("".join(texto))
+                    texto = []
+            elif palavra == b"row":
+                if nivel <= 1 and celulas:
+                    if linhas_lidas == indice_linha:
+                        return celulas
+                    linhas_lidas += 1
+                celulas, texto = [], []
+            elif palavra == b"pard":
+                nivel = 0
+            elif palavra == b"intbl":
+                nivel = max(nivel, 1)
+            elif palavra == b"itap":
+                nivel = int(parametro or 1)
+            elif palavra == b"uc":
+                uc = int(parametro or 1)
+            elif palavra == b"u":
+                codigo = int(parametro or 0)
+                if nivel == 1:
+                    texto.append(chr(codigo + 65536 if codigo < 0 else codigo))
+                pular_caracteres = uc
+            elif palavra == b"ansicpg" and parametro and int(parametro) > 0:
+                codificacao = f"cp{int(parametro)}"
+            elif palavra in TEXTO_CONTROLES:
+                if palavra == b"par" and nivel == 0 and linhas_lidas:
+                    # Parágrafo fora da tabela depois de alguma linha: a primeira tabela acabou
+                    return None
+                if nivel == 1:
+                    texto.append(TEXTO_CONTROLES[palavra])
+            continue
+
+        if hexa is not None:
+            if pular_caracteres:
+                pular_caracteres -= 1
+            elif nivel == 1:
+                texto.append(bytes.fromhex(hexa.decode()).decode(codificacao, "replace"))
+            continue
+
+        if simbolo is not None:
+            if nivel == 1 and simbolo in TEXTO_SIMBOLOS:
+                texto.append(TEXTO_SIMBOLOS[simbolo])
+            continue
+
+        if literal is not None:
+            if pular_caracteres:
+                descartar = min(pular_caracteres, len(literal))
+                pular_caracteres -= descartar
+                literal = literal[descartar:]
+            if nivel == 1 and literal:
+                texto.append(literal.decode(codificacao, "replace"))
+
+    return None
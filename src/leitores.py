@@ -0,0 +1,83 @@
+import zipfile
+from lxml import etree
+
+from rastreamento import trecho
+
+# ==============================================================================
+# LEITURA RÁPIDA DA TABELA DO MCALC (.DOCX)
+# ==============================================================================
+# O python-docx monta o modelo de objetos do documento inteiro só para lermos a
+# 2ª linha da 1ª tabela. Aqui lemos o word/document.xml direto do zip com
+# iterparse e paramos assim que essa linha termina.
+
+NS_WORD = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+W = f"{{{NS_WORD}}}"
+
+def _texto_run(run):
+    """Texto de um <w:r>, com as mesmas conversões do python-docx (tab, quebra de linha, hífen)."""
+    partes = []
+    for filho in run:
+        tag = filho.tag
+        if tag == W + "t":
+            partes.append(filho.text or "")
+        elif tag in (W + "tab", W + "ptab"):
+            partes.append("\t")
+        elif tag == W + "cr":
+            partes.append("\n")
+        elif tag == W + "br":
+            # Só a quebra de linha comum vira "\n"; quebras de página/coluna viram ""
+            if filho.get(W + "type", "textWrapping") == "textWrapping":
+                partes.append("\n")
+        elif tag == W + "noBreakHyphen":
+            partes.append("-")
+    return "".join(partes)
+
+def _texto_paragrafo(paragrafo):
+    partes = []
+    for filho in paragrafo:
+        if filho.tag == W + "r":
+            partes.append(_texto_run(filho))
+        elif filho.tag == W + "hyperlink":
+            partes.extend(_texto_run(run) for run in filho.iterchildren(W + "r"))
+    return "".join(partes)
+
+def _texto_celula(celula):
+    """Equivalente a cell.text do python-docx: parágrafos diretos unidos por '\\n'."""
+    return "\n".join(_texto_paragrafo(p) for p in celula.iterchildren(W + "p"))
+
+def _textos_linha(linha):
+    """Textos das células de um <w:tr> na grade da tabela (células mescladas com gridSpan se repetem)."""
+    textos = []
+    for celula in linha.iterchildren(W + "tc"):
+        texto = _texto_celula(celula)
+        span = celula.find(f"{W}tcPr/{W}gridSpan")
+        repeticoes = int(span.get(W + "val")) if span is not None else 1
+        textos.extend([texto] * repeticoes)
+    return textos
+
+def ler_celulas_docx(caminho_arquivo_word, indice_linha=1):
+    """
+    Devolve os textos das células da linha `indice_linha` da primeira tabela do
+    documento (mesmo resultado de documento.tables[0].cell(indice_linha, n).text),
+    ou None se não houver tabela ou ela tiver menos linhas.
+    """
+    with trecho('docx_abrir'):
+        arquivo_zip = zipfile.ZipFile(caminho_arquivo_word)
+    with arquivo_zip, trecho('tabela_ler', leitor='lxml'):
+        with arquivo_zip.open("word/document.xml") as xml:
+            primeira_tabela = None
+            linhas_lidas = 0
+            for _, linha in etree.iterparse(xml, events=("end",), tag=W + "tr"):
+                tabela = linha.getparent()
+                # Só conta tabelas diretas do corpo (document.tables ignora tabelas aninhadas)
+                if tabela.getparent() is None or tabela.getparent().tag != W + "body":
+                    continue
+                if primeira_tabela is None:
+                    primeira_tabela = tabela
+                elif tabela is not primeira_tabela:
+                    return None
+
+                if linhas_lidas == indice_linha:
+                    return _textos_linha(linha)
+                linhas_lidas += 1
+    return None
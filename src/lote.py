@@ -0,0 +1,204 @@
+import argparse
+import os
+import sys
+import time
+
+from colunar import ListaMateriais
+from extracao_paralela import extrair_listas
+from processor import indexar_template, preencher_planilha_excel
+
+# ==============================================================================
+# PROCESSAMENTO EM LOTE: VÁRIAS LISTAS DO MCALC CONTRA UM MESMO TEMPLATE
+# ==============================================================================
+
+EXTENSOES_LISTA = ('.docx', '.rtf', '.rtf.doc', '.csv', '.txt')
+
+def listar_listas(pasta):
+    """Listas do MCalc na pasta, em ordem alfabética (ignora os arquivos de trava '~$' do Word)."""
+    return sorted(
+        os.path.join(pasta, nome) for nome in os.listdir(pasta)
+        if nome.lower().endswith(EXTENSOES_LISTA) and not nome.startswith('~$')
+    )
+
+def nomes_de_saida(arquivos):
+    """
+    Nome base da planilha gerada para cada lista ({caminho: nome}): o nome da lista sem extensão
+    ou, quando duas listas teriam o mesmo nome (as exportações .docx/.rtf do MCalc vêm em pares),
+    o nome com a extensão ('lista.rtf' -> 'lista.rtf_processado.xlsx'). Se ainda repetir (mesmo
+    nome em pastas diferentes), ganha ' (2)', ' (3)'... A comparação ignora maiúsculas, como o Windows.
+    """
+    sem_extensao = [os.path.splitext(os.path.basename(caminho))[0] for caminho in arquivos]
+    contagem = {}
+    for nome in sem_extensao:
+        contagem[nome.lower()] = contagem.get(nome.lower(), 0) + 1
+
+    nomes = {}
+    usados = set()
+    for caminho, nome in zip(arquivos, sem_extensao):
+        if contagem[nome.lower()] > 1:
+            nome = os.path.basename(caminho)
+        candidato, n = nome, 1
+        while candidato.lower() in usados:
+            n += 1
+            candidato = f"{nome} ({n})"
+        usados.add(candidato.lower())
+        nomes[caminho] = candidato
+    return nomes
+
+def _preencher(caminho_planilha, dados, motor, indice, relatorio, caminho_saida, incremental):
+    if incremental:
+        from incremental import atualizar_planilha
+        return atualizar_planilha(caminho_planilha, dados, caminho_saida=caminho_saida, indice=indice, relatorio=relatorio)
+    return preencher_planilha_excel(caminho_planilha, dados, motor=motor, indice=indice, relatorio=relatorio,
+                                    caminho_saida=caminho_saida)
+
+def _mensagem_erro(e):
+    return str(e) or type(e).__name__
+
+def _agrupar(dados, fontes):
+    """
+    Agrega os perfis repetidos (ListaMateriais.agregar) e devolve (lista agregada, agrupamentos),
+    com as linhas de origem de cada item agregado como [arquivo, posição na lista] tiradas de 'fontes'.
+    """
+    agregada, origens = dados.agregar()
+    agrupamentos = [
+        {'perfil': agregada.perfis[j], 'aco': agregada.acos[j], 'comprimento': agregada.comprimentos[j],
+         'peso': agregada.pesos[j], 'origens': [fontes[i] for i in origem]}
+        for j, origem in enumerate(origens)
+    ]
+    return agregada, agrupamentos
+
+def processar_lote(arquivos, caminho_planilha, pasta_saida=None, combinado=False, processos=None, motor='patch',
+                   caminho_saida=None, incremental=False, agrupar=False, tamanho_bloco=None, nomes_saida=None,
+                   usar_cache=True):
+    """
+    Processa várias listas contra o mesmo template numa única execução.
+    - O template é indexado uma única vez; cada lista recebe uma cópia do índice.
+    - A leitura das listas (.docx/.rtf/.csv) é distribuída num pool de processos (extracao_paralela):
+      'processos' = nº de workers (padrão: nº de núcleos), 'tamanho_bloco' = listas por tarefa.
+    - combinado=False gera '<lista>_processado.xlsx' por lista (listas com o mesmo nome não se
+      sobrescrevem: ver nomes_de_saida); combinado=True junta todos os itens (na ordem dos arquivos)
+      num único '<template>_processado.xlsx'.
+    - nomes_saida: {caminho: nome base} das planilhas geradas, para quem precisa considerar outras
+      listas além das deste lote (padrão: nomes_de_saida(arquivos)).
+    - caminho_saida, se informado, substitui o nome gerado quando há uma única saída
+      (modo combinado ou uma única lista).
+    - incremental=True atualiza as planilhas já geradas regravando só as linhas afetadas
+      pelos registros que mudaram (incremental.atualizar_planilha, sempre com o motor 'patch').
+    - agrupar=True soma comprimentos e pesos dos perfis repetidos (mesmo perfil, aço e tipo) antes
+      de preencher, uma linha por perfil distinto; 'agrupamentos' no resumo liga cada item
+      agregado às linhas de origem ([arquivo, posição na lista]).
+    - usar_cache=False lê a estrutura do template do arquivo, sem ler nem gravar o cache de templates.
+    Retorna o resumo por arquivo: [{'arquivo', 'itens', 'extracao_ms', 'preenchimento_ms', 'saida', 'erro',
+    'comprimento_da_descricao', 'linhas_preenchidas', 'itens_sem_linha', 'faixas_ocultas', 'tempos_ms'}]
+    (os quatro últimos vêm do relatório do preenchimento).
+    """
+    pasta_saida = pasta_saida or os.path.dirname(os.path.abspath(caminho_planilha))
+    nome_template, extensao = os.path.splitext(os.path.basename(caminho_planilha))
+
+    saida_unica = caminho_saida if (combinado or len(arquivos) == 1) else None
+    nomes = nomes_saida or nomes_de_saida(arquivos)
+
+    indice = indexar_template(caminho_planilha, usar_cache)
+    resumo = []
+    dados_combinados = []  # ListaMateriais de cada arquivo, juntadas no fim (modo combinado)
+
+    for caminho, (dados, extracao_ms, erro) in zip(arquivos, extrair_listas(arquivos, processos, tamanho_bloco)):
+        item = {
+            'arquivo': caminho,
+            'itens': len(dados) if dados else 0,
+            'extracao_ms': extracao_ms,
+            'preenchimento_ms': 0.0,
+            'saida': None,
+            'erro': erro or (None if dados else "Nenhum dado extraído"),
+            # Itens sem L total na lista, cujo comprimento foi lido da descrição
+            'comprimento_da_descricao': [dados.perfis[i] for i in dados.linhas_comprimento_da_descricao()] if dados else [],
+        }
+        resumo.append(item)
+        if not dados:
+            continue
+
+        if combinado:
+            dados_combinados.append(dados)
+            continue
+
+        relatorio = {}
+        if agrupar:
+            dados, relatorio['agrupamentos'] = _agrupar(dados, [[caminho, i] for i in range(len(dados))])
+        inicio = time.perf_counter()
+        try:
+            item['saida'] = _preencher(
+                caminho_planilha, dados, motor, indice, relatorio,
+                saida_unica or os.path.join(pasta_saida, f"{nomes[caminho]}_processado{extensao}"), incremental,
+            )
+        except Exception as e:
+            # Planilha de saída aberta no Excel, valor inválido na lista...: registra e segue com as demais
+            item['erro'] = _mensagem_erro(e)
+            continue
+        finally:
+            item['preenchimento_ms'] = (time.perf_counter() - inicio) * 1000
+        item.update(relatorio)
+
+    if combinado and dados_combinados:
+        relatorio = {}
+        dados = ListaMateriais.concatenar(dados_combinados)
+        if agrupar:
+            fontes = [[item['arquivo'], i] for item in resumo if item['itens'] for i in range(item['itens'])]
+            dados, relatorio['agrupamentos'] = _agrupar(dados, fontes)
+        inicio = time.perf_counter()
+        saida, erro = None, None
+        try:
+            saida = _preencher(
+                caminho_planilha, dados, motor, indice, relatorio,
+                saida_unica or os.path.join(pasta_saida, f"{nome_template}_processado{extensao}"), incremental,
+            )
+        except Exception as e:
+            erro = _mensagem_erro(e)
+        # No modo combinado o preenchimento é único; o tempo (ou o erro) fica registrado em todas as listas usadas
+        preenchimento_ms = (time.perf_counter() - inicio) * 1000
+        for item in resumo:
+            if item['itens']:
+                item['saida'] = saida
+                item['preenchimento_ms'] = preenchimento_ms
+                if erro:
+                    item['erro'] = erro
+                else:
+                    item.update(relatorio)
+
+    return resumo
+
+def imprimir_resumo(resumo):
+    """Mostra o tempo de cada arquivo do lote no console."""
+    print("\n[LOTE] Resumo por arquivo:")
+    for item in resumo:
+        nome = os.path.basename(item['arquivo'])
+        if item['erro']:
+            print(f"  [ERRO] {nome}: {item['erro']}")
+            continue
+        print(f"  [OK] {nome}: {item['itens']} itens | extração {item['extracao_ms']:.0f} ms"
+              f" | preenchimento {item['preenchimento_ms']:.0f} ms")
+    # No modo combinado várias listas compartilham o mesmo preenchimento; conta uma vez por saída
+    preenchimentos = {item['saida']: item['preenchimento_ms'] for item in resumo if item['saida']}
+    total_ms = sum(item['extracao_ms'] for item in resumo) + sum(preenchimentos.values())
+    print(f"[LOTE] {len(resumo)} arquivo(s), {total_ms:.0f} ms somados")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Processa uma pasta de listas do MCalc contra um template.")
+    parser.add_argument("pasta", help="Pasta com as listas (.docx, .rtf)")
+    parser.add_argument("template", help="Planilha modelo (.xlsx)")
+    parser.add_argument("--saida", help="Pasta dos arquivos gerados (padrão: pasta do template)")
+    parser.add_argument("--combinado", action="store_true", help="Gera uma única planilha com todas as listas")
+    parser.add_argument("--processos", type=int, default=None, help="Nº de processos para ler as listas")
+    parser.add_argument("--bloco", type=int, default=None, help="Nº de listas por tarefa enviada a cada processo")
+    parser.add_argument("--motor", default="patch", choices=("openpyxl", "streaming", "patch"))
+    parser.add_argument("--incremental", action="store_true", help="Regrava só as linhas alteradas nas planilhas já geradas")
+    parser.add_argument("--agrupar", action="store_true", help="Soma os perfis repetidos numa única linha")
+    parser.add_argument("--sem-cache", action="store_true", help="Lê a estrutura do template sem usar o cache")
+    args = parser.parse_args()
+
+    arquivos = listar_listas(args.pasta)
+    if not arquivos:
+        sys.exit(f"Nenhuma lista encontrada em {args.pasta}")
+    imprimir_resumo(processar_lote(arquivos, args.template, args.saida, args.combinado, args.processos, args.motor,
+                                   incremental=args.incremental, agrupar=args.agrupar, tamanho_bloco=args.bloco,
+                                   usar_cache=not args.sem_cache))
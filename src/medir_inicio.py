@@ -0,0 +1,78 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# ==============================================================================
+# MEDIÇÃO DO TEMPO DE ABERTURA DO APLICATIVO
+# ==============================================================================
+# Abre o aplicativo várias vezes com AUT_LISTA_MEDIR_INICIO=1 (ele fecha sozinho
+# quando a janela aparece) e lê os tempos que ele mesmo registra (inicializacao.py).
+# A 1ª abertura conta como "fria" (arquivos fora do cache do disco, se a máquina
+# acabou de ligar ou a build é nova) e a mediana das demais como "quente".
+# Uso: python src/medir_inicio.py dist/ListaMaterialApp/ListaMaterialApp.exe [--vezes 5]
+#      python src/medir_inicio.py python src/gui.py
+
+# Metas de abertura (ms, do início do processo até a janela visível) da build rápida
+META_FRIO_MS = 3000
+META_QUENTE_MS = 1500
+
+def medir(comando, vezes=5, tempo_limite=60):
+    """Abre o aplicativo 'vezes' vezes e devolve [{tempos registrados pelo app + 'parede_ms'}]."""
+    import inicializacao
+
+    medidas = []
+    with tempfile.TemporaryDirectory(prefix="medir_inicio_") as pasta:
+        registro = os.path.join(pasta, "inicializacao.jsonl")
+        ambiente = dict(os.environ, **{inicializacao.VARIAVEL_MEDIR: "1", "AUT_LISTA_INICIO": registro})
+        for _ in range(vezes):
+            inicio = time.perf_counter()
+            subprocess.run(comando, env=ambiente, timeout=tempo_limite, check=True)
+            parede_ms = (time.perf_counter() - inicio) * 1000
+            with open(registro, encoding="utf-8") as arquivo:
+                medida = json.loads(arquivo.readlines()[-1])
+            medida['parede_ms'] = parede_ms
+            medidas.append(medida)
+    return medidas
+
+def resumir(medidas, meta_frio=META_FRIO_MS, meta_quente=META_QUENTE_MS):
+    """Abertura fria (1ª) e quente (mediana das demais), comparadas com as metas."""
+    frio = medidas[0]['total_ms']
+    quente = statistics.median(medida['total_ms'] for medida in medidas[1:]) if len(medidas) > 1 else None
+    return {
+        'frio_ms': frio,
+        'quente_ms': quente,
+        'meta_frio_ms': meta_frio,
+        'meta_quente_ms': meta_quente,
+        'dentro_da_meta': frio <= meta_frio and (quente is None or quente <= meta_quente),
+        'medidas': medidas,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mede o tempo de abertura do aplicativo (fria e quente).")
+    parser.add_argument("comando", nargs="+", help="Executável (ou 'python src/gui.py') a medir")
+    parser.add_argument("--vezes", type=int, default=5, help="Nº de aberturas (a 1ª é a fria)")
+    parser.add_argument("--meta-frio", type=float, default=META_FRIO_MS, help="Meta da abertura fria (ms)")
+    parser.add_argument("--meta-quente", type=float, default=META_QUENTE_MS, help="Meta da abertura quente (ms)")
+    parser.add_argument("--saida", help="Grava o resultado em JSON neste arquivo")
+    args = parser.parse_args(argv)
+
+    resultado = resumir(medir(args.comando, args.vezes), args.meta_frio, args.meta_quente)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+
+    quente = f"{resultado['quente_ms']:.0f} ms" if resultado['quente_ms'] is not None else "-"
+    print(f"[INICIO] fria {resultado['frio_ms']:.0f} ms (meta {args.meta_frio:.0f}) | "
+          f"quente {quente} (meta {args.meta_quente:.0f})")
+    for i, medida in enumerate(resultado['medidas'], start=1):
+        print(f"  {i}: total {medida['total_ms']:.0f} ms | imports {medida['imports_ms']:.0f} ms |"
+              f" janela {medida['janela_ms']:.0f} ms | parede {medida['parede_ms']:.0f} ms")
+    return 0 if resultado['dentro_da_meta'] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,604 @@
+import posixpath
+import re
+import zipfile
+from xml.etree import ElementTree
+from xml.parsers import expat
+
+# ==============================================================================
+# MOTORES DE GRAVAÇÃO DIRETA NO ARQUIVO .XLSX (SEM OPENPYXL)
+# ==============================================================================
+# O .xlsx é um zip de XMLs. Aqui lemos e regravamos apenas a aba que recebe os
+# dados; as demais partes (estilos, tema, sharedStrings, outras abas) são copiadas.
+
+NS_PLANILHA = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+NS_REL_DOC = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_REL_PACOTE = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+REGEX_REFERENCIA = re.compile(r'([A-Z]+)(\d+)')
+
+# Colunas lidas na passada de leitura (A = descrição/código, J = comprimento)
+COLUNA_DESCRICAO = 1
+COLUNA_COMPRIMENTO = 10
+
+TIPO_CALC_CHAIN = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/calcChain"
+
+# Tamanho aproximado (em caracteres) acumulado antes de cada escrita no zip
+TAMANHO_BLOCO_ESCRITA = 64 * 1024
+
+def indice_coluna(letras):
+    """Converte a letra da coluna ('A', 'Q', 'AA') para o índice numérico (1, 17, 27)."""
+    indice = 0
+    for letra in letras:
+        indice = indice * 26 + (ord(letra) - 64)
+    return indice
+
+def letra_coluna(indice):
+    """Converte o índice numérico da coluna para letras (17 -> 'Q')."""
+    letras = ""
+    while indice:
+        indice, resto = divmod(indice - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+def caminhos_das_abas(arquivo_zip):
+    """
+    XML de cada aba do workbook: ({nome da aba: caminho no zip}, nome da aba ativa).
+    A aba ativa é a mesma que workbook.active do openpyxl.
+    """
+    workbook = ElementTree.fromstring(arquivo_zip.read("xl/workbook.xml"))
+    aba_ativa = 0
+    visao = workbook.find(f"{{{NS_PLANILHA}}}bookViews/{{{NS_PLANILHA}}}workbookView")
+    if visao is not None:
+        aba_ativa = int(visao.get("activeTab", 0))
+
+    alvos = {}
+    relacoes = ElementTree.fromstring(arquivo_zip.read("xl/_rels/workbook.xml.rels"))
+    for relacao in relacoes.findall(f"{{{NS_REL_PACOTE}}}Relationship"):
+        alvo = relacao.get("Target")
+        alvos[relacao.get("Id")] = alvo.lstrip("/") if alvo.startswith("/") else posixpath.normpath(posixpath.join("xl", alvo))
+
+    caminhos = {}
+    abas = workbook.findall(f"{{{NS_PLANILHA}}}sheets/{{{NS_PLANILHA}}}sheet")
+    for aba in abas:
+        id_relacao = aba.get(f"{{{NS_REL_DOC}}}id")
+        if id_relacao not in alvos:
+            raise KeyError(f"Aba '{aba.get('name')}' não encontrada nas relações do workbook ({id_relacao})")
+        caminhos[aba.get("name")] = alvos[id_relacao]
+    return caminhos, abas[aba_ativa].get("name")
+
+def caminho_da_aba(arquivo_zip, aba=None):
+    """XML da aba com o nome 'aba' (None = aba ativa)."""
+    caminhos, ativa = caminhos_das_abas(arquivo_zip)
+    nome = ativa if aba is None else aba
+    if nome not in caminhos:
+        raise KeyError(f"Aba não encontrada no template: {nome}")
+    return caminhos[nome]
+
+def caminho_aba_ativa(arquivo_zip):
+    """Descobre o XML da aba ativa (a mesma que workbook.active do openpyxl)."""
+    return caminho_da_aba(arquivo_zip)
+
+def _alteracoes_por_caminho(arquivo_zip, alteracoes):
+    """Troca os nomes das abas de {aba: (plano, ocultas)} pelos caminhos dos XMLs no zip."""
+    por_caminho = {}
+    for aba, alteracao in alteracoes.items():
+        caminho = caminho_da_aba(arquivo_zip, aba)
+        if caminho in por_caminho:
+            raise ValueError(f"A aba '{aba}' recebeu mais de um plano de preenchimento")
+        por_caminho[caminho] = alteracao
+    return por_caminho
+
+def caminho_calc_chain(arquivo_zip):
+    """Caminho do calcChain.xml declarado nas relações do workbook (ou None)."""
+    relacoes = ElementTree.fromstring(arquivo_zip.read("xl/_rels/workbook.xml.rels"))
+    for relacao in relacoes.findall(f"{{{NS_REL_PACOTE}}}Relationship"):
+        if relacao.get("Type") == TIPO_CALC_CHAIN:
+            alvo = relacao.get("Target")
+            return alvo.lstrip("/") if alvo.startswith("/") else posixpath.normpath(posixpath.join("xl", alvo))
+    return None
+
+def forcar_recalculo(xml_workbook):
+    """
+    Marca fullCalcOnLoad="1" no <calcPr> do workbook.xml (como o openpyxl faz),
+    para o Excel recalcular as fórmulas que dependem das células preenchidas.
+    Edita só o necessário; o restante do XML fica byte a byte igual.
+    """
+    calc = re.search(rb'<calcPr\b[^>]*?/?>', xml_workbook)
+    if calc is None:
+        marcador = b"</definedNames>" if b"</definedNames>" in xml_workbook else b"</sheets>"
+        return xml_workbook.replace(marcador, marcador + b'<calcPr fullCalcOnLoad="1"/>', 1)
+
+    tag = calc.group(0)
+    if b"fullCalcOnLoad=" in tag:
+        nova = re.sub(rb'fullCalcOnLoad="[^"]*"', b'fullCalcOnLoad="1"', tag)
+    else:
+        nova = tag.replace(b"<calcPr", b'<calcPr fullCalcOnLoad="1"', 1)
+    return xml_workbook[:calc.start()] + nova + xml_workbook[calc.end():]
+
+def ler_strings_compartilhadas(arquivo_zip):
+    """Lê xl/sharedStrings.xml (texto de cada <si>, incluindo rich text)."""
+    try:
+        conteudo = arquivo_zip.read("xl/sharedStrings.xml")
+    except KeyError:
+        return []
+    raiz = ElementTree.fromstring(conteudo)
+    strings = []
+    for item in raiz.iter(f"{{{NS_PLANILHA}}}si"):
+        # Ignora o texto fonético (<rPh>), como o Excel/openpyxl
+        foneticos = {id(t) for rph in item.iter(f"{{{NS_PLANILHA}}}rPh") for t in rph.iter(f"{{{NS_PLANILHA}}}t")}
+        strings.append("".join(t.text or "" for t in item.iter(f"{{{NS_PLANILHA}}}t") if id(t) not in foneticos))
+    return strings
+
+def _escapar_texto(texto):
+    return texto.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+def _escapar_atributo(texto):
+    return (_escapar_texto(texto).replace('"', "&quot;")
+            .replace("\n", "&#10;").replace("\r", "&#13;").replace("\t", "&#9;"))
+
+def xml_celula(referencia, estilo, valor):
+    """Monta o XML de uma célula com valor numérico ou texto (inline, sem mexer no sharedStrings)."""
+    atributo_estilo = f' s="{estilo}"' if estilo is not None else ""
+    if valor is None:
+        return f'<c r="{referencia}"{atributo_estilo}/>'
+    if isinstance(valor, bool):
+        return f'<c r="{referencia}"{atributo_estilo} t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, float):
+        # Mesma precisão que o openpyxl grava (16 dígitos significativos)
+        return f'<c r="{referencia}"{atributo_estilo}><v>{valor:.16g}</v></c>'
+    if isinstance(valor, int):
+        return f'<c r="{referencia}"{atributo_estilo}><v>{valor}</v></c>'
+    texto = _escapar_texto(str(valor))
+    return f'<c r="{referencia}"{atributo_estilo} t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+def _converter_valor(tipo, texto, formula, strings):
+    """Converte o conteúdo bruto de uma célula para o mesmo valor que o openpyxl devolve."""
+    if formula is not None:
+        return "=" + formula
+    if tipo == "inlineStr":
+        return texto
+    if texto is None or texto == "":
+        return None
+    if tipo == "s":
+        return strings[int(texto)]
+    if tipo in ("str", "e"):
+        return texto
+    if tipo == "b":
+        return bool(int(texto))
+    if "." in texto or "E" in texto or "e" in texto:
+        return float(texto)
+    return int(texto)
+
+# ==============================================================================
+# PASSADA DE LEITURA: COLUNAS A E J DA ABA ATIVA
+# ==============================================================================
+
+class _LeitorColunas:
+    """Handlers expat que coletam (linha, valor_a, valor_j) de cada <row>."""
+    def __init__(self, strings):
+        self.strings = strings
+        self.linhas = []
+        self.linha = 0
+        self.valores = None
+        self.coluna = 0
+        self.tipo = None
+        self.texto = None
+        self.formula = None
+        self.capturando = None
+        self.alvo = False
+
+    def _interessa(self):
+        """A célula atual (self.linha, self.coluna) deve ser lida?"""
+        return self.coluna in (COLUNA_DESCRICAO, COLUNA_COMPRIMENTO)
+
+    def _guardar(self, valor):
+        self.valores[0 if self.coluna == COLUNA_DESCRICAO else 1] = valor
+
+    def inicio(self, nome, atributos):
+        if nome == "row":
+            self.linha = int(atributos["r"]) if "r" in atributos else self.linha + 1
+            self.valores = [None, None]
+            self.coluna = 0
+        elif nome == "c":
+            referencia = atributos.get("r")
+            self.coluna = indice_coluna(REGEX_REFERENCIA.match(referencia).group(1)) if referencia else self.coluna + 1
+            self.tipo = atributos.get("t", "n")
+            self.texto = None
+            self.formula = None
+            self.alvo = self._interessa()
+        elif self.alvo and nome in ("v", "t", "f"):
+            if nome == "f":
+                self.formula = ""
+            elif self.texto is None:
+                self.texto = ""
+            self.capturando = nome
+
+    def dados(self, texto):
+        if self.capturando == "f":
+            self.formula += texto
+        elif self.capturando:
+            self.texto += texto
+
+    def fim(self, nome):
+        if nome in ("v", "t", "f"):
+            self.capturando = None
+        elif nome == "c" and self.alvo:
+            self._guardar(_converter_valor(self.tipo, self.texto, self.formula, self.strings))
+        elif nome == "row":
+            self.linhas.append((self.linha, self.valores[0], self.valores[1]))
+
+class _LeitorCelulas(_LeitorColunas):
+    """Coleta o valor de células específicas {(linha, coluna)} em vez das colunas A e J."""
+    def __init__(self, strings, celulas):
+        super().__init__(strings)
+        self.celulas = set(celulas)
+        self.encontradas = {}
+
+    def _interessa(self):
+        return (self.linha, self.coluna) in self.celulas
+
+    def _guardar(self, valor):
+        self.encontradas[(self.linha, self.coluna)] = valor
+
+def _ler_aba(caminho_planilha, aba, criar_leitor):
+    with zipfile.ZipFile(caminho_planilha) as arquivo_zip:
+        leitor = criar_leitor(ler_strings_compartilhadas(arquivo_zip))
+        parser = expat.ParserCreate()
+        parser.buffer_text = True
+        parser.StartElementHandler = leitor.inicio
+        parser.EndElementHandler = leitor.fim
+        parser.CharacterDataHandler = leitor.dados
+        with arquivo_zip.open(caminho_da_aba(arquivo_zip, aba)) as entrada:
+            parser.ParseFile(entrada)
+    return leitor
+
+def ler_colunas_template(caminho_planilha, aba=None):
+    """
+    Lê a aba 'aba' (None = aba ativa) do template sem openpyxl e devolve
+    [(linha, valor_a, valor_j), ...] na ordem do arquivo, com os mesmos valores que o openpyxl leria.
+    """
+    return _ler_aba(caminho_planilha, aba, _LeitorColunas).linhas
+
+def ler_celulas_template(caminho_planilha, celulas, aba=None):
+    """
+    Valores das células {(linha, coluna)} pedidas, na aba 'aba' (None = aba ativa), como o openpyxl leria.
+    Células ausentes do arquivo (vazias) valem None.
+    """
+    celulas = set(celulas)
+    if not celulas:
+        return {}
+    encontradas = _ler_aba(caminho_planilha, aba, lambda strings: _LeitorCelulas(strings, celulas)).encontradas
+    return {celula: encontradas.get(celula) for celula in celulas}
+
+# ==============================================================================
+# PASSADA DE ESCRITA: MOTOR 'STREAMING'
+# ==============================================================================
+
+class _ReescritorAba:
+    """
+    Handlers expat que regravam a aba evento a evento, trocando apenas
+    as células do plano e o atributo 'hidden' das linhas.
+    """
+    def __init__(self, saida, plano, ocultas):
+        self.saida = saida
+        self.buffer = []
+        self.tamanho_buffer = 0
+        self.plano = plano
+        self.ocultas = ocultas
+        self.linhas_pendentes = sorted(plano)
+        self.celulas_pendentes = []
+        self.linha_atual = None
+        self.coluna_atual = 0
+        self.tag_aberta = False
+        self.profundidade_ignorada = 0
+
+    def escrever(self, texto):
+        if self.tag_aberta:
+            self.buffer.append(">")
+            self.tag_aberta = False
+        self.buffer.append(texto)
+        self.tamanho_buffer += len(texto)
+        if self.tamanho_buffer >= TAMANHO_BLOCO_ESCRITA:
+            self.descarregar()
+
+    def descarregar(self):
+        self.saida.write("".join(self.buffer).encode("utf-8"))
+        self.buffer = []
+        self.tamanho_buffer = 0
+
+    def _emitir_celulas_ate(self, coluna_limite):
+        while self.celulas_pendentes and (coluna_limite is None or self.celulas_pendentes[0][0] < coluna_limite):
+            coluna, valor = self.celulas_pendentes.pop(0)
+            self.escrever(xml_celula(f"{letra_coluna(coluna)}{self.linha_atual}", None, valor))
+
+    def _emitir_linhas_ate(self, linha_limite):
+        # Linhas do plano que não existem no XML do template
+        while self.linhas_pendentes and (linha_limite is None or self.linhas_pendentes[0] < linha_limite):
+            linha = self.linhas_pendentes.pop(0)
+            oculta = ' hidden="1"' if self.ocultas.get(linha) else ""
+            celulas = "".join(
+                xml_celula(f"{letra_coluna(coluna)}{linha}", None, valor)
+                for coluna, valor in sorted(self.plano[linha].items())
+            )
+            self.escrever(f'<row r="{linha}"{oculta}>{celulas}</row>')
+
+    def declaracao(self, versao, codificacao, standalone):
+        autonomo = {1: ' standalone="yes"', 0: ' standalone="no"'}.get(standalone, "")
+        self.escrever(f'<?xml version="{versao}" encoding="UTF-8"{autonomo}?>\r\n')
+
+    def inicio(self, nome, atributos):
+        if self.profundidade_ignorada:
+            self.profundidade_ignorada += 1
+            return
+
+        if nome == "row":
+            linha = int(atributos["r"]) if "r" in atributos else (self.linha_atual or 0) + 1
+            self._emitir_linhas_ate(linha)
+            if self.linhas_pendentes and self.linhas_pendentes[0] == linha:
+                self.linhas_pendentes.pop(0)
+            self.linha_atual = linha
+            self.coluna_atual = 0
+            self.celulas_pendentes = sorted(self.plano.get(linha, {}).items())
+
+            if linha in self.ocultas:
+                atributos = dict(atributos)
+                if self.ocultas[linha]:
+                    atributos["hidden"] = "1"
+                else:
+                    atributos.pop("hidden", None)
+
+        elif nome == "c" and self.linha_atual is not None:
+            referencia = atributos.get("r")
+            if referencia:
+                self.coluna_atual = indice_coluna(REGEX_REFERENCIA.match(referencia).group(1))
+            else:
+                self.coluna_atual += 1
+                referencia = f"{letra_coluna(self.coluna_atual)}{self.linha_atual}"
+
+            self._emitir_celulas_ate(self.coluna_atual)
+            if self.celulas_pendentes and self.celulas_pendentes[0][0] == self.coluna_atual:
+                _, valor = self.celulas_pendentes.pop(0)
+                self.escrever(xml_celula(referencia, atributos.get("s"), valor))
+                # Descarta o conteúdo original da célula (valor/fórmula antigos)
+                self.profundidade_ignorada = 1
+                return
+
+        texto_atributos = "".join(f' {chave}="{_escapar_atributo(valor)}"' for chave, valor in atributos.items())
+        self.escrever(f"<{nome}{texto_atributos}")
+        self.tag_aberta = True
+
+    def fim(self, nome):
+        if self.profundidade_ignorada:
+            self.profundidade_ignorada -= 1
+            return
+
+        if nome == "row":
+            self._emitir_celulas_ate(None)
+            self.linha_atual = None
+        elif nome == "sheetData":
+            self._emitir_linhas_ate(None)
+
+        if self.tag_aberta:
+            self.tag_aberta = False
+            self.escrever("/>")
+        else:
+            self.escrever(f"</{nome}>")
+
+    def dados(self, texto):
+        if not self.profundidade_ignorada:
+            self.escrever(_escapar_texto(texto))
+
+def gravar_xlsx_streaming(caminho_origem, caminho_destino, plano, ocultas):
+    """
+    Gera o arquivo de saída numa única passada:
+    - todas as partes do zip são copiadas como estão, exceto a aba ativa;
+    - a aba ativa é lida com expat e regravada com as células do plano e o
+      estado de linhas ocultas aplicados. Estilos e fórmulas não são tocados;
+    - o calcChain é removido (o plano pode gravar valores sobre fórmulas do resumo)
+      e o workbook.xml recebe fullCalcOnLoad para o Excel recalcular ao abrir.
+    """
+    gravar_xlsx_streaming_abas(caminho_origem, caminho_destino, {None: (plano, ocultas)})
+
+def gravar_xlsx_streaming_abas(caminho_origem, caminho_destino, alteracoes):
+    """Como gravar_xlsx_streaming, para várias abas: alteracoes = {nome da aba (None = ativa): (plano, ocultas)}."""
+    with zipfile.ZipFile(caminho_origem) as origem, \
+            zipfile.ZipFile(caminho_destino, "w", zipfile.ZIP_DEFLATED) as destino:
+        por_caminho = _alteracoes_por_caminho(origem, alteracoes)
+        caminho_calc = caminho_calc_chain(origem)
+        for info in origem.infolist():
+            if info.filename == caminho_calc:
+                continue
+            if info.filename == "xl/workbook.xml":
+                destino.writestr(info, forcar_recalculo(origem.read(info)))
+                continue
+            if info.filename not in por_caminho:
+                conteudo = origem.read(info)
+                if caminho_calc:
+                    conteudo = _remover_calc_chain(info.filename, conteudo, caminho_calc)
+                destino.writestr(info, conteudo)
+                continue
+
+            plano, ocultas = por_caminho[info.filename]
+            with origem.open(info) as entrada, destino.open(_info_saida(info), "w") as saida:
+                reescritor = _ReescritorAba(saida, plano, ocultas)
+                parser = expat.ParserCreate()
+                parser.buffer_text = True
+                parser.XmlDeclHandler = reescritor.declaracao
+                parser.StartElementHandler = reescritor.inicio
+                parser.EndElementHandler = reescritor.fim
+                parser.CharacterDataHandler = reescritor.dados
+                parser.ParseFile(entrada)
+                reescritor.descarregar()
+
+# ==============================================================================
+# MOTOR 'PATCH' (EDIÇÃO DIRETA DOS BYTES DA ABA)
+# ==============================================================================
+# Só as linhas tocadas pelo plano (ou cujo estado de oculta muda) são decodificadas
+# e reescritas; todo o resto da aba é copiado byte a byte.
+
+REGEX_INICIO_LINHA = re.compile(rb'<row\b[^>]*?(/?)>')
+REGEX_NUMERO_LINHA = re.compile(rb'\sr="(\d+)"')
+REGEX_OCULTA = re.compile(r'\shidden="([^"]*)"')
+REGEX_CELULA = re.compile(r'<c\b([^>]*?)(?:/>|>.*?</c>)', re.S)
+REGEX_REF_CELULA = re.compile(r'\sr="([A-Z]+)\d+"')
+REGEX_ESTILO_CELULA = re.compile(r'\ss="(\d+)"')
+
+def _ajustar_oculta(tag, oculta):
+    """Liga/desliga hidden na tag <row>; devolve a tag original se o estado já for o desejado."""
+    atual = REGEX_OCULTA.search(tag)
+    if bool(atual and atual.group(1) in ("1", "true")) == oculta:
+        return tag
+    tag = REGEX_OCULTA.sub("", tag)
+    if oculta:
+        fechamento = "/>" if tag.endswith("/>") else ">"
+        tag = tag[:-len(fechamento)] + ' hidden="1"' + fechamento
+    return tag
+
+def _aplicar_celulas(corpo, linha, gravacoes):
+    """Troca/insere as células do plano dentro do conteúdo de um <row>, mantendo a ordem das colunas."""
+    pendentes = sorted(gravacoes.items())
+    partes = []
+    posicao = 0
+    coluna = 0
+    for celula in REGEX_CELULA.finditer(corpo):
+        if not pendentes:
+            break
+        # Sem 'r', a célula é a seguinte à anterior (como no leitor do motor 'streaming')
+        referencia = REGEX_REF_CELULA.search(celula.group(1))
+        coluna = indice_coluna(referencia.group(1)) if referencia else coluna + 1
+
+        novas = []
+        while pendentes and pendentes[0][0] < coluna:
+            coluna_nova, valor = pendentes.pop(0)
+            novas.append(xml_celula(f"{letra_coluna(coluna_nova)}{linha}", None, valor))
+        if pendentes and pendentes[0][0] == coluna:
+            _, valor = pendentes.pop(0)
+            estilo = REGEX_ESTILO_CELULA.search(celula.group(1))
+            novas.append(xml_celula(f"{letra_coluna(coluna)}{linha}", estilo.group(1) if estilo else None, valor))
+            partes.append(corpo[posicao:celula.start()])
+            posicao = celula.end()
+        elif novas:
+            partes.append(corpo[posicao:celula.start()])
+            posicao = celula.start()
+        partes.extend(novas)
+
+    partes.append(corpo[posicao:])
+    partes.extend(xml_celula(f"{letra_coluna(coluna)}{linha}", None, valor) for coluna, valor in pendentes)
+    return "".join(partes)
+
+def _aplicar_linha(texto, linha, gravacoes, oculta):
+    """Reescreve um elemento <row> completo com as gravações e o estado de oculta."""
+    tamanho_tag = texto.index(">") + 1
+    tag = texto[:tamanho_tag]
+    fechada = tag.endswith("/>")
+    corpo = "" if fechada else texto[tamanho_tag:-len("</row>")]
+
+    if oculta is not None:
+        tag = _ajustar_oculta(tag, oculta)
+    if gravacoes:
+        corpo = _aplicar_celulas(corpo, linha, gravacoes)
+    if fechada:
+        if not corpo:
+            return tag
+        tag = tag[:-2] + ">"
+    return f"{tag}{corpo}</row>"
+
+def _xml_linha_nova(linha, gravacoes, oculta):
+    atributo_oculta = ' hidden="1"' if oculta else ""
+    celulas = "".join(xml_celula(f"{letra_coluna(coluna)}{linha}", None, valor) for coluna, valor in sorted(gravacoes.items()))
+    return f'<row r="{linha}"{atributo_oculta}>{celulas}</row>'.encode("utf-8")
+
+def aplicar_patch_aba(xml_aba, plano, ocultas):
+    """
+    Aplica o plano e o estado de linhas ocultas diretamente nos bytes do XML da aba.
+    Linhas que não mudam não são decodificadas nem reescritas.
+    """
+    alteradas = set(plano) | set(ocultas)
+    linhas = []
+    numero = 0
+    for inicio in REGEX_INICIO_LINHA.finditer(xml_aba):
+        # Sem 'r' (permitido pela especificação), a linha é a seguinte à anterior
+        referencia = REGEX_NUMERO_LINHA.search(inicio.group(0))
+        numero = int(referencia.group(1)) if referencia else numero + 1
+        linhas.append((numero, inicio))
+    existentes = {numero for numero, _ in linhas}
+    faltantes = sorted(linha for linha in plano if linha not in existentes)
+
+    partes = []
+    posicao = 0
+    for numero, inicio in linhas:
+        while faltantes and faltantes[0] < numero:
+            linha = faltantes.pop(0)
+            partes.append(xml_aba[posicao:inicio.start()])
+            partes.append(_xml_linha_nova(linha, plano[linha], ocultas.get(linha)))
+            posicao = inicio.start()
+        if numero not in alteradas:
+            continue
+
+        fim = inicio.end() if inicio.group(1) else xml_aba.index(b"</row>", inicio.end()) + len(b"</row>")
+        original = xml_aba[inicio.start():fim].decode("utf-8")
+        novo = _aplicar_linha(original, numero, plano.get(numero), ocultas.get(numero))
+        if novo != original:
+            partes.append(xml_aba[posicao:inicio.start()])
+            partes.append(novo.encode("utf-8"))
+            posicao = fim
+
+    if faltantes:
+        novas = b"".join(_xml_linha_nova(linha, plano[linha], ocultas.get(linha)) for linha in faltantes)
+        vazia = xml_aba.find(b"<sheetData/>", posicao)
+        if vazia != -1:
+            partes.append(xml_aba[posicao:vazia])
+            partes.append(b"<sheetData>" + novas + b"</sheetData>")
+            posicao = vazia + len(b"<sheetData/>")
+        else:
+            fim_dados = xml_aba.index(b"</sheetData>", posicao)
+            partes.append(xml_aba[posicao:fim_dados])
+            partes.append(novas)
+            posicao = fim_dados
+
+    partes.append(xml_aba[posicao:])
+    return b"".join(partes)
+
+def _remover_calc_chain(nome, conteudo, caminho_calc):
+    """Tira as referências ao calcChain do [Content_Types].xml e das relações do workbook."""
+    if nome == "[Content_Types].xml":
+        parte = re.escape(f"/{caminho_calc}".encode("utf-8"))
+        return re.sub(rb'<Override\b[^>]*?PartName="' + parte + rb'"[^>]*?/>', b"", conteudo)
+    if nome == "xl/_rels/workbook.xml.rels":
+        tipo = re.escape(TIPO_CALC_CHAIN.encode("utf-8"))
+        return re.sub(rb'<Relationship\b[^>]*?Type="' + tipo + rb'"[^>]*?/>', b"", conteudo)
+    return conteudo
+
+def gravar_xlsx_patch(caminho_origem, caminho_destino, plano, ocultas):
+    """
+    Gera a saída alterando o mínimo possível do template:
+    - partes não tocadas (estilos, tema, sharedStrings, outras abas...) são copiadas sem alteração;
+    - na aba ativa, só os <c> do plano e os atributos hidden dos <row> são editados;
+    - o calcChain é removido (e o workbook marcado com fullCalcOnLoad) para o Excel recalcular.
+    """
+    gravar_xlsx_patch_abas(caminho_origem, caminho_destino, {None: (plano, ocultas)})
+
+def gravar_xlsx_patch_abas(caminho_origem, caminho_destino, alteracoes):
+    """Como gravar_xlsx_patch, para várias abas: alteracoes = {nome da aba (None = ativa): (plano, ocultas)}."""
+    with zipfile.ZipFile(caminho_origem) as origem, \
+            zipfile.ZipFile(caminho_destino, "w", zipfile.ZIP_DEFLATED) as destino:
+        por_caminho = _alteracoes_por_caminho(origem, alteracoes)
+        caminho_calc = caminho_calc_chain(origem)
+        for info in origem.infolist():
+            if info.filename == caminho_calc:
+                continue
+
+            conteudo = origem.read(info)
+            if info.filename in por_caminho:
+                conteudo = aplicar_patch_aba(conteudo, *por_caminho[info.filename])
+            elif info.filename == "xl/workbook.xml":
+                conteudo = forcar_recalculo(conteudo)
+            elif caminho_calc:
+                conteudo = _remover_calc_chain(info.filename, conteudo, caminho_calc)
+            destino.writestr(info, conteudo)
+
+def _info_saida(info):
+    nova = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+    nova.compress_type = zipfile.ZIP_DEFLATED
+    nova.external_attr = info.external_attr
+    return nova
@@ -1,8 +1,12 @@
 import os
 import re
-import docx
-import openpyxl
-from utils import convert_to_mm  # Mantendo seu import original
+import time
+from array import array
+from collections import deque
+from functools import lru_cache
+from itertools import compress
+from rastreamento import trecho
+from utils import converter_varios_mm
 
 # ==============================================================================
 # 1. FUNÇÕES AUXILIARES E REGEX (NOVAS E ATUALIZADAS)
@@ -32,6 +36,8 @@ def normalizar_nome_perfil_w(desc):
         return f"W{altura}X{peso}"
     return desc.upper().strip()
 
+REGEX_COMPRIMENTO_MM = re.compile(r'(?:C|L|COMPR)[\s=:]*(\d{3,5})|(?:^|\s)(\d{3,5})\s*mm', re.IGNORECASE)
+
 def extrair_comprimento_texto(texto):
     """
     Tenta extrair o comprimento de dentro da string de descrição se não houver na coluna.
@@ -40,8 +46,7 @@ def extrair_comprimento_texto(texto):
     """
     # Procura padrões explícitos: C=..., L=..., ou número seguido de 'mm'
     # Ex: "C=4500", "L: 3000", "4500mm"
-    regex_mm = r'(?:C|L|COMPR)[\s=:]*(\d{3,5})|(?:^|\s)(\d{3,5})\s*mm'
-    match = re.search(regex_mm, texto, re.IGNORECASE)
+    match = REGEX_COMPRIMENTO_MM.search(texto)
     
     if match:
         # Pega o primeiro grupo que não for None
@@ -52,49 +57,65 @@ def extrair_comprimento_texto(texto):
             return 0.0
     return 0.0
 
-def classificar_e_mapear_perfil(desc):
-    """Identifica o TIPO de perfil e retorna o código e uma chave de classificação."""
-    desc_upper = desc.upper()
-    
+# Regras de classificação na ordem de prioridade: (padrão compilado, código no Excel, tipo).
+# Os padrões são aplicados à descrição em maiúsculas; vale a primeira regra que casar.
+REGRAS_PERFIL = [
     # Prioridade para VIGA W detectada via Regex robusto
-    if re.search(r'W\s*\d', desc_upper):
-        return 'VIGA W', 'VIGA_W'
+    (re.compile(r'W\s*\d'), 'VIGA W', 'VIGA_W'),
+    (re.compile(r'\['), 'U.s', 'PERFIL_U'),
+    (re.compile(r'UENR|IENR|CART|CA '), 'U.e', 'TERCA'),
+    (re.compile(r'L DOBRADO|^L '), 'L DOBRADO', 'CANTONEIRA'),
+    (re.compile(r'RED'), 'FERRO MECANICO RED.', 'TUBO'),
+    (re.compile(r'TUBO'), 'TUBO', 'TUBO'),
+]
+PERFIL_NAO_IDENTIFICADO = ('N/D', 'OUTROS')
 
-    if '[' in desc_upper or '][' in desc_upper: return 'U.s', 'PERFIL_U'
-    if 'UENR' in desc_upper or 'IENR' in desc_upper or 'CART' in desc_upper or 'CA ' in desc_upper: return 'U.e', 'TERCA'
-    if 'L DOBRADO' in desc_upper or desc_upper.startswith('L '): return 'L DOBRADO', 'CANTONEIRA'
-    if 'RED' in desc_upper: return 'FERRO MECANICO RED.', 'TUBO' 
-    if 'TUBO' in desc_upper: return 'TUBO', 'TUBO' 
+@lru_cache(maxsize=4096)
+def classificar_e_mapear_perfil(desc):
+    """Identifica o TIPO de perfil e retorna o código e uma chave de classificação (memoizado por descrição)."""
+    desc_upper = desc.upper()
+    for padrao, codigo, tipo in REGRAS_PERFIL:
+        if padrao.search(desc_upper):
+            return codigo, tipo
+    return PERFIL_NAO_IDENTIFICADO
 
-    return 'N/D', 'OUTROS'
+def classificar_varios(descricoes):
+    """
+    Classifica uma lista de descrições de uma vez.
+    Retorna (codigos, tipos), duas listas na mesma ordem de 'descricoes'.
+    """
+    classificacoes = [classificar_e_mapear_perfil(desc) for desc in descricoes]
+    return [c[0] for c in classificacoes], [c[1] for c in classificacoes]
 
 def parse_dimensoes_inteligente(desc, tipo_perfil):
     """Aplica regras de extração de dimensões e retorna as medidas."""
     a, b, c, esp = 0.0, 0.0, 0.0, 0.0
     # Extrai todos os números
     numeros_str_list = re.findall(r'[\d\./,]+', desc) # Adicionado vírgula no regex
+    # Nenhuma regra usa mais que os 4 primeiros números; convertidos de uma vez (com cache)
+    medidas = converter_varios_mm(numeros_str_list[:4])
 
     if tipo_perfil in ['PERFIL_U']:
-        if len(numeros_str_list) >= 3:
-            a = convert_to_mm(numeros_str_list[0])
-            b = convert_to_mm(numeros_str_list[1])
-            esp = convert_to_mm(numeros_str_list[2])
+        if len(medidas) >= 3:
+            a = medidas[0]
+            b = medidas[1]
+            esp = medidas[2]
     elif tipo_perfil == 'TERCA':
-        if len(numeros_str_list) >= 4:
-            a = convert_to_mm(numeros_str_list[0])
-            b = convert_to_mm(numeros_str_list[1])
-            c = convert_to_mm(numeros_str_list[2])
-            esp = convert_to_mm(numeros_str_list[3])
+        if len(medidas) >= 4:
+            a = medidas[0]
+            b = medidas[1]
+            c = medidas[2]
+            esp = medidas[3]
     elif tipo_perfil == 'CANTONEIRA':
-        if len(numeros_str_list) >= 2:
+        if len(medidas) >= 2:
             # Lógica simplificada
-            aba = convert_to_mm(numeros_str_list[0])
+            aba = medidas[0]
             a, b = aba, aba
-            if len(numeros_str_list) > 1:
-                esp = convert_to_mm(numeros_str_list[1])
+            if len(medidas) > 1:
+                esp = medidas[1]
     elif tipo_perfil == 'TUBO':
-        if len(numeros_str_list) >= 1:
-            esp = convert_to_mm(numeros_str_list[0])
+        if len(medidas) >= 1:
+            esp = medidas[0]
             
     # OBS: VIGA_W não precisa extrair dimensões aqui pois usaremos a busca por nome no Excel
     # ou podemos extrair apenas para log.
@@ -105,63 +126,108 @@ def parse_dimensoes_inteligente(desc, tipo_perfil):
 # 2. EXTRAÇÃO DE DADOS (DOCX)
 # ==============================================================================
 
-def extrair_dados_word(caminho_arquivo_word):
-    """Lê a tabela do Word e processa linhas, incluindo lógica específica para W."""
-    documento = docx.Document(caminho_arquivo_word)
+def extrair_dados_word(caminho_arquivo_word, leitor='lxml', progresso=None):
+    """
+    Lê a tabela do Word e processa linhas, incluindo lógica específica para W.
+    O formato (.docx, RTF, CSV/TXT) é reconhecido pelos bytes iniciais (ver entradas.py).
+    leitor='lxml' (padrão) lê só a 2ª linha da 1ª tabela do .docx direto do XML;
+    leitor='python-docx' monta o documento completo com o python-docx.
+    progresso: função opcional chamada como progresso('extracao', i, 0) a cada item
+    (o total só é conhecido no fim da leitura).
+    Retorna uma ListaMateriais (colunar; também se comporta como a lista de
+    [perfil, aço, l_total_m, peso]), ou None se não houver itens.
+    """
+    from colunar import ListaMateriais
+    from entradas import ler_linhas
+
+    def linhas_com_progresso():
+        for i, linha in enumerate(ler_linhas(caminho_arquivo_word, leitor), start=1):
+            if progresso: progresso('extracao', i, 0)
+            yield linha
+
+    # Comprimentos e pesos são convertidos em lote, coluna a coluna (ver converter_colunas_numericas)
+    with trecho('extracao', arquivo=os.path.basename(caminho_arquivo_word), leitor=leitor):
+        dados_finais = ListaMateriais.de_linhas(linhas_com_progresso())
+    return dados_finais or None
+
+def iterar_registros(caminho_arquivo_word, leitor='lxml'):
+    """
+    Gera os itens [perfil, aço, l_total_m, peso] um a um, à medida que o arquivo é lido;
+    pode ser passado direto para preencher_planilha_excel.
+    """
+    from entradas import ler_linhas
+
+    for perfil, aco, val_coluna, peso_str in ler_linhas(caminho_arquivo_word, leitor):
+        yield converter_registro(perfil, aco, val_coluna, peso_str)
+
+def _numero_ou_none(texto):
+    texto = texto.strip()
+    if not texto:
+        return None
     try:
-        tabela = documento.tables[0]
-    except IndexError:
+        return float(texto.replace(',', '.'))
+    except ValueError:
         return None
 
-    if len(tabela.rows) < 2: return None
+def numeros_da_coluna(textos):
+    """
+    Converte uma coluna inteira de textos numéricos de uma vez: uma troca de vírgula por
+    ponto no texto da coluna e um map(float) sobre as linhas. Se alguma linha não for
+    número (vazia, texto), a coluna é convertida linha a linha.
+    Devolve float ou None (vazio/não numérico) por linha.
+    """
+    linhas = '\n'.join(textos).replace(',', '.').split('\n')
+    if len(linhas) == len(textos):
+        try:
+            return list(map(float, linhas))
+        except ValueError:
+            pass
+    return [_numero_ou_none(texto) for texto in textos]
 
-    # Extração "Bruta" das colunas
-    perfils_str = tabela.cell(1, 0).text
-    acos_str = tabela.cell(1, 1).text
-    ltotais_str = tabela.cell(1, 2).text
-    pesos_str = tabela.cell(1, 3).text
+def converter_colunas_numericas(perfis, ltotais, pesos):
+    """
+    Versão em lote da conversão de converter_registro para listas inteiras.
+    Retorna (comprimentos_m, pesos, usou_descricao): dois array('d') e um array('B') com 1
+    nas linhas cujo comprimento veio da descrição (coluna vazia, zero ou inválida).
+    """
+    # CORREÇÃO: a coluna vem em cm; convertemos para m
+    comprimentos = [valor / 100.0 if valor is not None else 0.0 for valor in numeros_da_coluna(ltotais)]
+    usou_descricao = array('B', [comprimento == 0.0 for comprimento in comprimentos])
+    # Só as linhas sem comprimento na coluna passam pela busca na descrição
+    for i in compress(range(len(comprimentos)), usou_descricao):
+        comprimentos[i] = extrair_comprimento_texto(perfis[i])
+    valores_peso = array('d', [0.0 if peso is None else peso for peso in numeros_da_coluna(pesos)])
+    return array('d', comprimentos), valores_peso, usou_descricao
 
-    lista_perfis = list(filter(None, perfils_str.strip().split('\n')))
-    lista_acos = list(filter(None, acos_str.strip().split('\n')))
-    lista_ltotais = list(filter(None, ltotais_str.strip().split('\n')))
-    lista_pesos = list(filter(None, pesos_str.strip().split('\n')))
+def converter_registro(perfil, aco, val_coluna, peso_str):
+    """Converte uma linha em texto da lista (perfil, aço, L total em cm, peso) no item usado no preenchimento."""
+    perfil = perfil.strip()
+    aco = aco.strip()
 
-    num_perfis = len(lista_perfis)
-    # Validação básica de quantidades
-    if num_perfis == 0: return None
-    
-    dados_finais = []
-    
-    for i in range(num_perfis):
-        perfil = lista_perfis[i].strip()
-        aco = lista_acos[i].strip() if i < len(lista_acos) else (lista_acos[0].strip() if lista_acos else "A36")
-        
-        # --- Lógica Híbrida de Comprimento ---
-        l_total_m = 0.0
-        
-        # 1. Tenta pegar da coluna da tabela (Prioridade 1 se existir)
-        val_coluna = lista_ltotais[i].strip() if i < len(lista_ltotais) else ""
-        if val_coluna:
-            try:
-                # CORREÇÃO: Dividimos por 100 para converter de cm para m, pois o Excel pode ter valores em cm
-                l_total_m = float(val_coluna.replace(',', '.')) / 100.0
-            except ValueError:
-                l_total_m = 0.0
-        
-        # 2. Se a coluna for 0 ou vazia, tenta extrair do texto da descrição (Prioridade 2)
-        if l_total_m == 0.0:
-            l_total_m = extrair_comprimento_texto(perfil)
+    # --- Lógica Híbrida de Comprimento ---
+    l_total_m = 0.0
 
-        # Peso
-        peso_str = lista_pesos[i].strip().replace(',', '.') if i < len(lista_pesos) else "0"
+    # 1. Tenta pegar da coluna da tabela (Prioridade 1 se existir)
+    val_coluna = val_coluna.strip()
+    if val_coluna:
         try:
-            peso_final = float(peso_str)
+            # CORREÇÃO: Dividimos por 100 para converter de cm para m, pois o Excel pode ter valores em cm
+            l_total_m = float(val_coluna.replace(',', '.')) / 100.0
         except ValueError:
-            peso_final = 0.0
+            l_total_m = 0.0
+
+    # 2. Se a coluna for 0 ou vazia, tenta extrair do texto da descrição (Prioridade 2)
+    if l_total_m == 0.0:
+        l_total_m = extrair_comprimento_texto(perfil)
 
-        dados_finais.append([perfil, aco, l_total_m, peso_final])
+    # Peso
+    peso_str = peso_str.strip().replace(',', '.')
+    try:
+        peso_final = float(peso_str)
+    except ValueError:
+        peso_final = 0.0
 
-    return dados_finais
+    return [perfil, aco, l_total_m, peso_final]
 
 # ==============================================================================
 # 3. MANIPULAÇÃO DO EXCEL
@@ -179,101 +245,461 @@ def encontrar_proxima_linha_vazia(sheet, codigo_secao, linha_inicio_busca):
                 return row
     return None
 
-def preencher_planilha_excel(caminho_planilha, dados_materiais):
+# Valores da coluna J (comprimento) que indicam linha livre. A busca por seção
+# aceita '0' em texto; a busca de Viga W (por nome) não aceita.
+VAZIOS_SECAO = [None, 0, '', '0', 0.0]
+VAZIOS_VIGA_W = [None, 0, '', 0.0]
+
+# Textos da coluna A que marcam o início do bloco de resumo (nunca ocultado)
+GATILHOS_RESUMO = ("TOTAL", "ATIVO FINAL", "RESUMO")
+
+class IndiceTemplate:
     """
-    Carrega o template, processa os dados (incluindo CA e W) e salva como '_processado'.
+    Índice das linhas livres do template, montado numa única passada pela planilha.
+    - linhas_w: nome normalizado (maiúsculo, sem espaços) -> fila de linhas livres
+    - linhas_secao: código da seção (coluna A) -> fila ordenada de linhas livres
+    Substitui as varreduras de linha a linha por consultas O(1) amortizadas,
+    devolvendo as mesmas linhas que as buscas originais.
     """
-    workbook = openpyxl.load_workbook(caminho_planilha)
-    sheet = workbook.active
-    
-    # 1. GERAÇÃO DO NOVO NOME DE ARQUIVO (_processado)
-    nome_base, extensao = os.path.splitext(caminho_planilha)
-    caminho_processado = f"{nome_base}_processado{extensao}"
-    
-    # Agrupa dados para processar em ordem
-    dados_agrupados = {}
-    for item in dados_materiais:
-        perfil_raw = item[0]
-        codigo_excel, tipo_perfil = classificar_e_mapear_perfil(perfil_raw)
-        chave = 'VIGA_W_GROUP' if tipo_perfil == 'VIGA_W' else codigo_excel
-        if chave not in dados_agrupados: dados_agrupados[chave] = []
-        dados_agrupados[chave].append(item)
-
-    # 2. PROCESSAMENTO DOS ITENS
-    for chave_grupo, itens_da_secao in dados_agrupados.items():
-        linha_de_busca_secao = 4
+    def __init__(self, linha_inicio=4):
+        self.linhas_w = {}
+        self.linhas_secao = {}
+        self.ocupadas = set()
+        # Dados para ocultar linhas sem reler a planilha (ver estado_linhas_ocultas)
+        self.linha_inicio = linha_inicio
+        self.ultima_linha = linha_inicio - 1
+        self.linha_resumo = None
+        self.sem_comprimento = []
+
+    @classmethod
+    def construir(cls, sheet, linha_inicio=4):
+        """Monta o índice a partir de uma aba do openpyxl."""
+        linhas = sheet.iter_rows(min_row=linha_inicio, max_row=sheet.max_row, max_col=10, values_only=True)
+        return cls.construir_de_linhas(
+            ((linha, valores[0], valores[9]) for linha, valores in enumerate(linhas, start=linha_inicio)),
+            linha_inicio,
+        )
+
+    @classmethod
+    def construir_de_linhas(cls, linhas, linha_inicio=4):
+        """Monta o índice a partir de tuplas (linha, valor_a, valor_j) em ordem crescente de linha."""
+        indice = cls(linha_inicio)
+        for linha, valor_a, valor_j in linhas:
+            if linha >= linha_inicio:
+                indice.registrar_linha(linha, valor_a, valor_j)
+        return indice
+
+    def registrar_linha(self, linha, valor_a, valor_j):
+        """Classifica uma linha do template (colunas A e J) nas filas de linhas livres."""
+        self.ultima_linha = linha
+        if self.linha_resumo is None:
+            texto_a = str(valor_a).strip().upper()
+            if any(gatilho in texto_a for gatilho in GATILHOS_RESUMO):
+                self.linha_resumo = linha
+            elif valor_a and valor_j in VAZIOS_SECAO:
+                self.sem_comprimento.append(linha)
+
+        if valor_a is None:
+            return
+        codigo = str(valor_a).strip()
+        if valor_j in VAZIOS_SECAO:
+            self.linhas_secao.setdefault(codigo, deque()).append(linha)
+        if valor_j in VAZIOS_VIGA_W:
+            nome = codigo.upper().replace(" ", "")
+            self.linhas_w.setdefault(nome, deque()).append(linha)
+
+    def linha_viga_w(self, nome_normalizado):
+        """Primeira linha livre com o nome do perfil W (não consome a linha)."""
+        fila = self.linhas_w.get(nome_normalizado.replace(" ", ""))
+        if not fila:
+            return None
+        while fila and fila[0] in self.ocupadas:
+            fila.popleft()
+        return fila[0] if fila else None
+
+    def proxima_linha_secao(self, codigo_secao):
+        """Consome a próxima linha livre da seção (equivale a avançar o ponteiro de busca)."""
+        fila = self.linhas_secao.get(codigo_secao)
+        while fila:
+            linha = fila.popleft()
+            if linha not in self.ocupadas:
+                return linha
+        return None
+
+    def marcar_ocupada(self, linha):
+        """Registra que a coluna J da linha recebeu comprimento."""
+        self.ocupadas.add(linha)
+
+    def copiar(self):
+        """Cópia independente do índice (as filas são consumidas durante o planejamento)."""
+        copia = IndiceTemplate(self.linha_inicio)
+        copia.linhas_w = {nome: deque(fila) for nome, fila in self.linhas_w.items()}
+        copia.linhas_secao = {codigo: deque(fila) for codigo, fila in self.linhas_secao.items()}
+        copia.ocupadas = set(self.ocupadas)
+        copia.ultima_linha = self.ultima_linha
+        copia.linha_resumo = self.linha_resumo
+        copia.sem_comprimento = list(self.sem_comprimento)
+        return copia
+
+    def para_dict(self):
+        """Estrutura do índice em tipos simples (JSON), para o cache de templates."""
+        return {
+            'linha_inicio': self.linha_inicio,
+            'ultima_linha': self.ultima_linha,
+            'linha_resumo': self.linha_resumo,
+            'sem_comprimento': self.sem_comprimento,
+            'linhas_w': {nome: list(fila) for nome, fila in self.linhas_w.items()},
+            'linhas_secao': {codigo: list(fila) for codigo, fila in self.linhas_secao.items()},
+            'ocupadas': sorted(self.ocupadas),
+        }
+
+    @classmethod
+    def de_dict(cls, dados):
+        """Reconstrói o índice a partir de para_dict()."""
+        indice = cls(dados['linha_inicio'])
+        indice.ultima_linha = dados['ultima_linha']
+        indice.linha_resumo = dados['linha_resumo']
+        indice.sem_comprimento = list(dados['sem_comprimento'])
+        indice.linhas_w = {nome: deque(fila) for nome, fila in dados['linhas_w'].items()}
+        indice.linhas_secao = {codigo: deque(fila) for codigo, fila in dados['linhas_secao'].items()}
+        indice.ocupadas = set(dados['ocupadas'])
+        return indice
+
+def planejar_preenchimento(indice, dados_materiais, itens_sem_linha=None, progresso=None):
+    """
+    Calcula as gravações do template sem tocar na planilha.
+    Retorna o plano {linha: {coluna: valor}} na ordem em que as linhas foram preenchidas.
+    Se 'itens_sem_linha' for uma lista, recebe os itens que não acharam linha livre no template.
+    progresso: função opcional chamada como progresso('planejamento', i, total) a cada item.
+    """
+    plano = {}
+    total_itens = len(dados_materiais) if hasattr(dados_materiais, '__len__') else 0
+    processados = 0
+
+    # Os itens são processados na ordem de chegada: cada grupo (seção ou vigas W) usa
+    # linhas próprias do template, então o resultado é o mesmo de agrupar antes e
+    # 'dados_materiais' pode ser um gerador ainda sendo lido (ver iterar_registros).
+    # Cada descrição é classificada uma única vez (classificar_e_mapear_perfil é memoizado).
+    for item, codigo_excel, tipo_perfil, dimensoes in _itens_classificados(dados_materiais):
+        chave_grupo = 'VIGA_W_GROUP' if tipo_perfil == 'VIGA_W' else codigo_excel
+        processados += 1
+        if progresso: progresso('planejamento', processados, total_itens)
+        perfil_desc, aco_tipo, l_total_m, peso_total = item
         
-        for item in itens_da_secao:
-            perfil_desc, aco_tipo, l_total_m, peso_total = item
-            _, tipo_perfil = classificar_e_mapear_perfil(perfil_desc)
-            
-            # Melhoria CA: Dobra a metragem
-            if 'CA ' in perfil_desc.upper():
-                l_total_m = l_total_m * 2
-            
-            linha_alvo = None
-            
-            # Identificação da linha (W por Nome, Outros por Próxima Vazia)
-            if tipo_perfil == 'VIGA_W':
-                nome_normalizado = normalizar_nome_perfil_w(perfil_desc)
-                for r in range(4, sheet.max_row + 1):
-                    val_cell = str(sheet.cell(row=r, column=1).value).strip().upper().replace(" ", "")
-                    if val_cell == nome_normalizado.replace(" ", ""):
-                        if sheet.cell(row=r, column=10).value in [None, 0, '', 0.0]:
-                            linha_alvo = r
-                            break
-            else:
-                linha_alvo = encontrar_proxima_linha_vazia(sheet, chave_grupo, linha_de_busca_secao)
+        # Melhoria CA: Dobra a metragem
+        if 'CA ' in perfil_desc.upper():
+            l_total_m = l_total_m * 2
+        
+        linha_alvo = None
+        
+        # Identificação da linha (W por Nome, Outros por Próxima Vazia)
+        if tipo_perfil == 'VIGA_W':
+            nome_normalizado = normalizar_nome_perfil_w(perfil_desc)
+            linha_alvo = indice.linha_viga_w(nome_normalizado)
+        else:
+            linha_alvo = indice.proxima_linha_secao(chave_grupo)
 
-            # --- GRAVAÇÃO DOS DADOS (CORREÇÃO AQUI) ---
-            if linha_alvo:
-                dim_a, dim_b, dim_c, dim_esp = parse_dimensoes_inteligente(perfil_desc, tipo_perfil)
-                
-                # Se NÃO for Viga W, preenchemos as dimensões técnicas (A, B, C, esp)
-                if tipo_perfil != 'VIGA_W':
-                    if tipo_perfil in ['PERFIL_U', 'TERCA']:
-                        sheet.cell(row=linha_alvo, column=2).value = dim_a
-                        sheet.cell(row=linha_alvo, column=4).value = dim_b
-                        sheet.cell(row=linha_alvo, column=6).value = dim_c
-                    elif tipo_perfil == 'CANTONEIRA':
-                        sheet.cell(row=linha_alvo, column=4).value = dim_a
-                        sheet.cell(row=linha_alvo, column=6).value = dim_b
-                    
-                    # Espessura sempre na coluna 8 para perfis dobrados/tubos
-                    sheet.cell(row=linha_alvo, column=8).value = dim_esp
-
-                # Colunas fixas para todos os perfis
-                sheet.cell(row=linha_alvo, column=9).value = aco_tipo
-                if l_total_m > 0:
-                    sheet.cell(row=linha_alvo, column=10).value = l_total_m
-                sheet.cell(row=linha_alvo, column=17).value = peso_total
+        if not linha_alvo and itens_sem_linha is not None:
+            itens_sem_linha.append(item)
+
+        if linha_alvo:
+            gravacoes = plano.setdefault(linha_alvo, {})
+            dim_a, dim_b, dim_c, dim_esp = dimensoes or parse_dimensoes_inteligente(perfil_desc, tipo_perfil)
+            
+            # Se NÃO for Viga W, preenchemos as dimensões técnicas (A, B, C, esp)
+            if tipo_perfil != 'VIGA_W':
+                if tipo_perfil in ['PERFIL_U', 'TERCA']:
+                    gravacoes[2] = dim_a
+                    gravacoes[4] = dim_b
+                    gravacoes[6] = dim_c
+                elif tipo_perfil == 'CANTONEIRA':
+                    gravacoes[4] = dim_a
+                    gravacoes[6] = dim_b
                 
-                # Atualiza o ponteiro de busca para não sobrescrever a mesma linha
-                if tipo_perfil != 'VIGA_W':
-                    linha_de_busca_secao = linha_alvo + 1
+                # Espessura sempre na coluna 8 para perfis dobrados/tubos
+                gravacoes[8] = dim_esp
+
+            # Colunas fixas para todos os perfis
+            gravacoes[9] = aco_tipo
+            if l_total_m > 0:
+                gravacoes[10] = l_total_m
+                # Linha deixa de estar livre para as próximas buscas
+                indice.marcar_ocupada(linha_alvo)
+            gravacoes[17] = peso_total
+
+    return plano
+
+def _itens_classificados(dados_materiais):
+    """
+    Gera (item, código, tipo, dimensões) para o planejamento. Uma ListaMateriais já traz
+    tudo calculado; para listas e geradores de itens, as dimensões ficam None (calculadas sob demanda).
+    """
+    if hasattr(dados_materiais, 'itens_classificados'):
+        return dados_materiais.itens_classificados()
+    return ((item, *classificar_e_mapear_perfil(item[0]), None) for item in dados_materiais)
+
+def indexar_template(caminho_planilha, usar_cache=True, aba=None):
+    """
+    Monta o IndiceTemplate da aba 'aba' (None = aba ativa) lendo só as colunas A e J do arquivo (sem openpyxl).
+    Com usar_cache, a estrutura vem do cache em disco (cache_template) quando o arquivo
+    não mudou desde a última leitura, e é gravada lá quando precisa ser descoberta.
+    """
+    import motor_xlsx
+    if usar_cache:
+        indice = _indice_do_cache(caminho_planilha, aba)
+        if indice:
+            return indice
+    indice = IndiceTemplate.construir_de_linhas(motor_xlsx.ler_colunas_template(caminho_planilha, aba))
+    if usar_cache:
+        _guardar_indice_no_cache(caminho_planilha, indice, aba)
+    return indice
+
+def _indice_do_cache(caminho_planilha, aba=None):
+    import cache_template
+    dados = cache_template.carregar(caminho_planilha, aba=aba)
+    return IndiceTemplate.de_dict(dados) if dados else None
+
+def _guardar_indice_no_cache(caminho_planilha, indice, aba=None):
+    import cache_template
+    cache_template.salvar(caminho_planilha, indice.para_dict(), aba=aba)
+
+def nome_arquivo_processado(caminho_planilha, caminho_saida=None):
+    """Arquivo gerado: caminho_saida, ou '<template>_processado.xlsx' ao lado do template."""
+    if caminho_saida:
+        return caminho_saida
+    nome_base, extensao = os.path.splitext(caminho_planilha)
+    return f"{nome_base}_processado{extensao}"
+
+def _relatorio_aba(plano, ocultas, itens_sem_linha):
+    return {
+        'linhas_preenchidas': sorted(plano),
+        'itens_sem_linha': itens_sem_linha,
+        'faixas_ocultas': [(primeira, ultima) for primeira, ultima, oculta in faixas_de_linhas(ocultas) if oculta],
+    }
+
+def preencher_planilha_excel(caminho_planilha, dados_materiais, motor='openpyxl', caminho_saida=None, indice=None, relatorio=None,
+                             progresso=None, usar_cache=True):
+    """
+    Carrega o template, processa os dados (incluindo CA e W) e salva como '_processado'.
+    dados_materiais: lista de itens ou gerador (iterar_registros), consumido durante o planejamento.
+    Motores disponíveis:
+    - 'openpyxl': carrega o workbook completo, grava célula a célula e salva (padrão).
+    - 'streaming': uma passada de leitura (só colunas A e J da aba ativa) monta o plano
+      e uma passada de escrita regrava apenas a aba ativa, copiando as demais partes do arquivo.
+    - 'patch': mesmo plano do 'streaming', mas edita só os bytes das células e linhas tocadas
+      na aba ativa; as demais partes são copiadas sem alteração e o calcChain é descartado.
+    caminho_saida: arquivo gerado (padrão: '<template>_processado.xlsx').
+    indice: IndiceTemplate já montado para este template (é copiado, não consumido),
+    para quem preenche várias listas no mesmo template sem reler a estrutura.
+    Sem 'indice', a estrutura vem do cache de templates (cache_template) quando o arquivo não mudou;
+    usar_cache=False lê sempre a estrutura do template e não grava no cache.
+    relatorio: dict opcional que recebe 'linhas_preenchidas', 'itens_sem_linha', 'faixas_ocultas'
+    (faixas contíguas de linhas ocultadas) e 'tempos_ms' por etapa.
+    progresso: função opcional progresso(etapa, atual, total) chamada no início de cada etapa
+    ('leitura_template', 'gravacao') e a cada item do planejamento. Uma exceção lançada por ela
+    interrompe o preenchimento antes da gravação do arquivo.
+    Retorna o caminho do arquivo gerado.
+    """
+    caminho_processado = nome_arquivo_processado(caminho_planilha, caminho_saida)
+    with trecho('preenchimento', motor=motor):
+        (resultado,), tempos = _preencher_abas(caminho_planilha, [(None, dados_materiais, indice)], motor,
+                                               caminho_processado, progresso, usar_cache)
+    if relatorio is not None:
+        relatorio.update(_relatorio_aba(*resultado))
+        relatorio['tempos_ms'] = tempos
 
-    # 3. LIMPEZA VISUAL E SALVAMENTO
-    ocultar_linhas_vazias(sheet)
-    
-    workbook.save(caminho_processado)
     print(f"\n[OK] Processamento finalizado com sucesso!")
     print(f"[ARQUIVO] Gerado: {caminho_processado}")
+    return caminho_processado
+
+def preencher_abas(caminho_planilha, dados_por_aba, motor='openpyxl', caminho_saida=None, relatorio=None, progresso=None,
+                   usar_cache=True):
+    """
+    Preenche várias abas do template com uma única leitura e uma única gravação do arquivo.
+    dados_por_aba: {nome da aba: dados_materiais}. A mesma lista pode ir para várias abas:
+    os itens já extraídos e classificados (ListaMateriais) são reaproveitados em cada uma,
+    por isso use listas, não geradores, quando repetir os dados.
+    Cada aba tem sua própria estrutura (seções, linhas W, resumo), lida ou tirada do cache por aba.
+    motor, caminho_saida, progresso e usar_cache funcionam como em preencher_planilha_excel.
+    relatorio: dict opcional que recebe 'abas' ({aba: linhas_preenchidas, itens_sem_linha,
+    faixas_ocultas}) e 'tempos_ms' por etapa, somados sobre as abas.
+    Uma aba que não existe no template gera KeyError antes de qualquer gravação.
+    Retorna o caminho do arquivo gerado.
+    """
+    caminho_processado = nome_arquivo_processado(caminho_planilha, caminho_saida)
+    tarefas = [(aba, dados, None) for aba, dados in dados_por_aba.items()]
+    with trecho('preenchimento', motor=motor, abas=len(tarefas)):
+        resultados, tempos = _preencher_abas(caminho_planilha, tarefas, motor, caminho_processado, progresso, usar_cache)
+    if relatorio is not None:
+        relatorio['abas'] = {aba: _relatorio_aba(*resultado) for (aba, _, _), resultado in zip(tarefas, resultados)}
+        relatorio['tempos_ms'] = tempos
+
+    print(f"\n[OK] Processamento finalizado com sucesso! ({len(tarefas)} abas)")
+    print(f"[ARQUIVO] Gerado: {caminho_processado}")
+    return caminho_processado
+
+def _indice_da_aba(caminho_planilha, aba, indice, construir, usar_cache=True):
+    """
+    Cópia do índice recebido, ou o do cache, ou um novo montado por construir() (e guardado no cache).
+    Sem usar_cache, o cache não é lido nem gravado.
+    """
+    if indice:
+        return indice.copiar()
+    if not usar_cache:
+        return construir()
+    indice = _indice_do_cache(caminho_planilha, aba)
+    if not indice:
+        indice = construir()
+        _guardar_indice_no_cache(caminho_planilha, indice, aba)
+    return indice
+
+def _planejar_abas(indices, tarefas, progresso):
+    """[(plano, ocultas, itens_sem_linha)] de cada aba, na ordem das tarefas."""
+    resultados = []
+    for indice, (aba, dados_materiais, _) in zip(indices, tarefas):
+        itens_sem_linha = []
+        with trecho('busca_linhas', aba=aba or "(ativa)"):
+            plano = planejar_preenchimento(indice, dados_materiais, itens_sem_linha, progresso)
+        with trecho('linhas_ocultas_plano'):
+            ocultas = estado_linhas_ocultas(indice, plano)
+        resultados.append((plano, ocultas, itens_sem_linha))
+    return resultados
+
+def _preencher_abas(caminho_planilha, tarefas, motor, caminho_processado, progresso, usar_cache=True):
+    """
+    Núcleo dos preenchimentos: tarefas = [(aba ou None para a ativa, dados_materiais, indice ou None)].
+    O template é lido e o resultado gravado uma vez, qualquer que seja o número de abas.
+    Retorna ([(plano, ocultas, itens_sem_linha)] por tarefa, tempos_ms por etapa).
+    """
+    tempos = {}
+    inicio = time.perf_counter()
+
+    if progresso: progresso('leitura_template', 0, 1)
+
+    if motor == 'openpyxl':
+        # Importado só aqui: os motores 'streaming' e 'patch' não usam o openpyxl
+        import openpyxl
+
+        with trecho('template_abrir'):
+            workbook = openpyxl.load_workbook(caminho_planilha)
+        sheets = [workbook[aba] if aba is not None else workbook.active for aba, _, _ in tarefas]
+        with trecho('indexacao'):
+            indices = [
+                _indice_da_aba(caminho_planilha, aba, indice, lambda sheet=sheet: IndiceTemplate.construir(sheet),
+                               usar_cache)
+                for sheet, (aba, _, indice) in zip(sheets, tarefas)
+            ]
+        tempos['leitura_template'] = _medir(inicio)
+
+        # 2. PROCESSAMENTO DOS ITENS (linhas ocultas calculadas do plano, sem reler as células)
+        inicio = time.perf_counter()
+        resultados = _planejar_abas(indices, tarefas, progresso)
+        tempos['planejamento'] = _medir(inicio)
+
+        # 3. GRAVAÇÃO, LIMPEZA VISUAL E SALVAMENTO
+        if progresso: progresso('gravacao', 0, 1)
+        inicio = time.perf_counter()
+        for sheet, (plano, ocultas, _) in zip(sheets, resultados):
+            with trecho('gravacao_celulas', linhas=len(plano)):
+                for linha, gravacoes in plano.items():
+                    for coluna, valor in gravacoes.items():
+                        sheet.cell(row=linha, column=coluna).value = valor
+            with trecho('ocultar_linhas'):
+                aplicar_linhas_ocultas(sheet, ocultas)
+        with trecho('salvar'):
+            workbook.save(caminho_processado)
+        tempos['gravacao'] = _medir(inicio)
+    elif motor in ('streaming', 'patch'):
+        import motor_xlsx
+
+        # Passada de leitura: monta índices e planos sem carregar estilos nem o DOM da planilha
+        with trecho('indexacao'):
+            indices = [
+                _indice_da_aba(caminho_planilha, aba, indice, lambda aba=aba: IndiceTemplate.construir_de_linhas(
+                    motor_xlsx.ler_colunas_template(caminho_planilha, aba)), usar_cache)
+                for aba, _, indice in tarefas
+            ]
+        tempos['leitura_template'] = _medir(inicio)
+
+        inicio = time.perf_counter()
+        resultados = _planejar_abas(indices, tarefas, progresso)
+        tempos['planejamento'] = _medir(inicio)
+
+        if progresso: progresso('gravacao', 0, 1)
+        inicio = time.perf_counter()
+        alteracoes = {aba: (plano, ocultas) for (aba, _, _), (plano, ocultas, _) in zip(tarefas, resultados)}
+        with trecho('gravacao_xlsx', motor=motor):
+            if motor == 'streaming':
+                motor_xlsx.gravar_xlsx_streaming_abas(caminho_planilha, caminho_processado, alteracoes)
+            else:
+                motor_xlsx.gravar_xlsx_patch_abas(caminho_planilha, caminho_processado, alteracoes)
+        tempos['gravacao'] = _medir(inicio)
+    else:
+        raise ValueError(f"Motor de preenchimento desconhecido: {motor}")
+
+    return resultados, tempos
+
+def _medir(inicio):
+    """Milissegundos decorridos desde 'inicio' (time.perf_counter)."""
+    return (time.perf_counter() - inicio) * 1000
 
 def ocultar_linhas_vazias(sheet, linha_inicio=4):
     """
     Oculta linhas sem metragem, protegendo o bloco de resumo.
     """
-    for row in range(linha_inicio, sheet.max_row + 1):
-        valor_A = str(sheet.cell(row=row, column=1).value).strip().upper()
+    with trecho('ocultar_linhas_vazias'):
+        for row in range(linha_inicio, sheet.max_row + 1):
+            valor_A = str(sheet.cell(row=row, column=1).value).strip().upper()
         
-        # Trava para manter o resumo visível (TOTAL ou ATIVO FINAL)
-        if "TOTAL" in valor_A or "ATIVO FINAL" in valor_A or "RESUMO" in valor_A:
-            for r_resumo in range(row, min(row + 25, sheet.max_row + 1)):
-                sheet.row_dimensions[r_resumo].hidden = False
-            break 
+            # Trava para manter o resumo visível (TOTAL ou ATIVO FINAL)
+            if "TOTAL" in valor_A or "ATIVO FINAL" in valor_A or "RESUMO" in valor_A:
+                for r_resumo in range(row, min(row + 25, sheet.max_row + 1)):
+                    sheet.row_dimensions[r_resumo].hidden = False
+                break 
             
-        valor_comprimento = sheet.cell(row=row, column=10).value
-        if sheet.cell(row=row, column=1).value and (valor_comprimento in [None, 0, '0', '', 0.0]):
-            sheet.row_dimensions[row].hidden = True
+            valor_comprimento = sheet.cell(row=row, column=10).value
+            if sheet.cell(row=row, column=1).value and (valor_comprimento in [None, 0, '0', '', 0.0]):
+                sheet.row_dimensions[row].hidden = True
+            else:
+                sheet.row_dimensions[row].hidden = False
+
+def estado_linhas_ocultas(indice, plano):
+    """
+    Reproduz o resultado de ocultar_linhas_vazias a partir do índice do template
+    e do plano de preenchimento, sem reler as células.
+    Retorna {linha: oculta} para as mesmas linhas que ocultar_linhas_vazias ajusta.
+    """
+    linha_fim = indice.linha_resumo if indice.linha_resumo is not None else indice.ultima_linha + 1
+    estado = dict.fromkeys(range(indice.linha_inicio, linha_fim), False)
+    for linha in indice.sem_comprimento:
+        estado[linha] = plano.get(linha, {}).get(10) in VAZIOS_SECAO
+
+    if indice.linha_resumo is not None:
+        for linha in range(indice.linha_resumo, min(indice.linha_resumo + 25, indice.ultima_linha + 1)):
+            estado[linha] = False
+    return estado
+
+def faixas_de_linhas(estado):
+    """Agrupa {linha: oculta} em faixas contíguas com o mesmo estado: [(primeira, última, oculta)]."""
+    faixas = []
+    for linha in sorted(estado):
+        oculta = estado[linha]
+        if faixas and faixas[-1][1] == linha - 1 and faixas[-1][2] == oculta:
+            faixas[-1][1] = linha
         else:
-            sheet.row_dimensions[row].hidden = False
\ No newline at end of file
+            faixas.append([linha, linha, oculta])
+    return [tuple(faixa) for faixa in faixas]
+
+def aplicar_linhas_ocultas(sheet, estado):
+    """
+    Aplica o estado de estado_linhas_ocultas numa aba do openpyxl, numa passada pelo dict
+    (as faixas de faixas_de_linhas só servem ao relatório; o openpyxl grava as linhas em ordem).
+    Só cria entradas em row_dimensions para linhas a ocultar; linhas visíveis só são
+    tocadas se o template as trouxer ocultas, e o XML salvo não ganha um <row> por linha.
+    """
+    dimensoes = sheet.row_dimensions
+    for linha, oculta in estado.items():
+        if oculta:
+            dimensoes[linha].hidden = True
+        elif linha in dimensoes and dimensoes[linha].hidden:
+            dimensoes[linha].hidden = False
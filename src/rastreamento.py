@@ -0,0 +1,217 @@
+import contextlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+# ==============================================================================
+# RASTREAMENTO DAS ETAPAS (TRECHOS, PERFIL E MEMÓRIA)
+# ==============================================================================
+# O processamento marca suas etapas com 'with trecho(nome):' (abrir o .docx, ler a
+# tabela, classificar, buscar linhas, gravar células, ocultar linhas, salvar...).
+# Desligado, que é o padrão, trecho() só testa uma variável global e devolve um
+# contexto vazio. Ligado (pela interface ou pela variável AUT_LISTA_RASTREIO), cada
+# trecho vira um evento com início, duração, thread e atributos, e o resultado vai
+# para o log e para um JSON no formato de eventos do Chrome (abre em
+# chrome://tracing ou ui.perfetto.dev), com o resumo por etapa. Opcionalmente
+# captura também o cProfile (só da thread que iniciou o rastreio) e o tracemalloc.
+# A extração feita em outros processos (lote com --jobs > 1) não entra no rastreio.
+
+VERSAO_RASTREIO = 1
+
+# "1" liga os trechos; "perfil" e/ou "memoria" (separados por vírgula) ligam também o cProfile e o tracemalloc
+VARIAVEL_RASTREIO = "AUT_LISTA_RASTREIO"
+# Arquivo do rastreio (padrão: pasta 'rastreios' ao lado do cache de templates)
+VARIAVEL_ARQUIVO = "AUT_LISTA_RASTREIO_ARQUIVO"
+
+# Rastreios mantidos na pasta padrão (os mais antigos são apagados)
+LIMITE_ARQUIVOS = 50
+# Funções do cProfile e linhas do tracemalloc guardadas no resultado
+LIMITE_PERFIL = 25
+LIMITE_MEMORIA = 10
+
+_sessao = None
+_NULO = contextlib.nullcontext()
+
+class _Sessao:
+    def __init__(self, perfil, memoria):
+        self.inicio = time.perf_counter()
+        self.data = datetime.now().isoformat(timespec="seconds")
+        self.eventos = []
+        self.pilhas = threading.local()
+        self.perfil = None
+        self.memoria = memoria
+        if perfil:
+            import cProfile
+            self.perfil = cProfile.Profile()
+            self.perfil.enable()
+        if memoria:
+            import tracemalloc
+            tracemalloc.start()
+
+class _Trecho:
+    __slots__ = ("sessao", "nome", "atributos", "inicio", "nivel")
+
+    def __init__(self, sessao, nome, atributos):
+        self.sessao = sessao
+        self.nome = nome
+        self.atributos = atributos
+
+    def __enter__(self):
+        pilha = getattr(self.sessao.pilhas, "trechos", None)
+        if pilha is None:
+            pilha = self.sessao.pilhas.trechos = []
+        self.nivel = len(pilha)
+        pilha.append(self.nome)
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *excecao):
+        fim = time.perf_counter()
+        self.sessao.pilhas.trechos.pop()
+        # list.append é atômico: trechos de várias threads (serviço, interface) vão para a mesma lista
+        self.sessao.eventos.append((self.nome, self.inicio, fim, self.nivel, threading.get_ident(),
+                                    self.atributos, excecao[0] is not None))
+        return False
+
+def trecho(nome, **atributos):
+    """Contexto que mede a etapa 'nome' quando o rastreio está ligado (sem custo quando desligado)."""
+    if _sessao is None:
+        return _NULO
+    return _Trecho(_sessao, nome, atributos)
+
+def ativo():
+    return _sessao is not None
+
+def opcoes_do_ambiente():
+    """Opções de AUT_LISTA_RASTREIO ({'perfil': bool, 'memoria': bool}), ou None se o rastreio está desligado."""
+    valor = os.environ.get(VARIAVEL_RASTREIO, "").strip().lower()
+    if valor in ("", "0"):
+        return None
+    opcoes = {parte.strip() for parte in valor.split(",")}
+    return {'perfil': "perfil" in opcoes, 'memoria': "memoria" in opcoes}
+
+def pasta_rastreios():
+    from cache_template import pasta_cache_padrao
+    return os.path.join(os.path.dirname(pasta_cache_padrao()), "rastreios")
+
+def arquivo_rastreio():
+    """AUT_LISTA_RASTREIO_ARQUIVO, ou 'rastreios/rastreio-<data e hora>.json' ao lado do cache de templates."""
+    return (os.environ.get(VARIAVEL_ARQUIVO)
+            or os.path.join(pasta_rastreios(), f"rastreio-{datetime.now():%Y%m%d-%H%M%S-%f}.json"))
+
+def iniciar(perfil=False, memoria=False):
+    """Liga o rastreio. RuntimeError se já houver um em andamento."""
+    global _sessao
+    if _sessao is not None:
+        raise RuntimeError("Já há um rastreio em andamento")
+    _sessao = _Sessao(perfil, memoria)
+
+def finalizar():
+    """Desliga o rastreio e devolve o resultado (ver _resultado), ou None se ele não estava ligado."""
+    global _sessao
+    sessao, _sessao = _sessao, None
+    if sessao is None:
+        return None
+    fim = time.perf_counter()
+    if sessao.perfil:
+        sessao.perfil.disable()
+    memoria = None
+    if sessao.memoria:
+        import tracemalloc
+        _, pico = tracemalloc.get_traced_memory()
+        estatisticas = tracemalloc.take_snapshot().statistics("lineno")[:LIMITE_MEMORIA]
+        tracemalloc.stop()
+        memoria = {
+            'pico_kb': pico / 1024,
+            'maiores': [{'local': f"{estatistica.traceback[0].filename}:{estatistica.traceback[0].lineno}",
+                         'kb': estatistica.size / 1024, 'blocos': estatistica.count} for estatistica in estatisticas],
+        }
+    return _resultado(sessao, fim, memoria)
+
+def _resultado(sessao, fim, memoria):
+    """
+    {'versao', 'data', 'total_ms', 'etapas': [{'nome', 'chamadas', 'total_ms'}] na ordem em que apareceram,
+    'perfil': [{'funcao', 'chamadas', 'proprio_ms', 'acumulado_ms'}] ou None, 'memoria': {'pico_kb', 'maiores'}
+    ou None, 'traceEvents': eventos no formato do Chrome}.
+    """
+    etapas = {}
+    eventos = []
+    for nome, inicio, termino, nivel, thread, atributos, falhou in sorted(sessao.eventos, key=lambda evento: evento[1]):
+        etapa = etapas.setdefault(nome, {'nome': nome, 'chamadas': 0, 'total_ms': 0.0})
+        etapa['chamadas'] += 1
+        etapa['total_ms'] += (termino - inicio) * 1000
+        argumentos = dict(atributos, nivel=nivel, **({'erro': True} if falhou else {}))
+        eventos.append({'name': nome, 'ph': "X", 'pid': os.getpid(), 'tid': thread,
+                        'ts': (inicio - sessao.inicio) * 1e6, 'dur': (termino - inicio) * 1e6,
+                        'args': {chave: valor if isinstance(valor, (int, float, bool)) else str(valor)
+                                 for chave, valor in argumentos.items()}})
+
+    perfil = None
+    if sessao.perfil:
+        import pstats
+        linhas = sorted(pstats.Stats(sessao.perfil).stats.items(), key=lambda item: item[1][3], reverse=True)
+        perfil = [{'funcao': f"{os.path.basename(arquivo)}:{linha}({funcao})", 'chamadas': chamadas,
+                   'proprio_ms': proprio * 1000, 'acumulado_ms': acumulado * 1000}
+                  for (arquivo, linha, funcao), (_, chamadas, proprio, acumulado, _) in linhas[:LIMITE_PERFIL]]
+
+    return {
+        'versao': VERSAO_RASTREIO,
+        'data': sessao.data,
+        'total_ms': (fim - sessao.inicio) * 1000,
+        'etapas': list(etapas.values()),
+        'perfil': perfil,
+        'memoria': memoria,
+        'traceEvents': eventos,
+    }
+
+def gravar(resultado, caminho=None):
+    """Grava o resultado em JSON (padrão: arquivo_rastreio()) e retorna o caminho, ou None se não deu para gravar."""
+    caminho = caminho or arquivo_rastreio()
+    try:
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        with open(caminho, "w", encoding="utf-8") as arquivo:
+            json.dump(resultado, arquivo, ensure_ascii=False)
+    except OSError:
+        return None
+    if os.path.dirname(os.path.abspath(caminho)) == os.path.abspath(pasta_rastreios()):
+        _remover_antigos()
+    return caminho
+
+def _remover_antigos():
+    pasta = pasta_rastreios()
+    antigos = sorted(nome for nome in os.listdir(pasta) if nome.startswith("rastreio-"))[:-LIMITE_ARQUIVOS]
+    for nome in antigos:
+        with contextlib.suppress(OSError):
+            os.remove(os.path.join(pasta, nome))
+
+@contextlib.contextmanager
+def rastrear(perfil=False, memoria=False, arquivo=None):
+    """
+    Rastreia o bloco e grava o JSON no fim (mesmo se o bloco falhar). O dict devolvido recebe,
+    ao sair, o resultado de finalizar() e 'arquivo' (caminho gravado ou None).
+    """
+    iniciar(perfil, memoria)
+    resultado = {}
+    try:
+        yield resultado
+    finally:
+        resultado.update(finalizar())
+        resultado['arquivo'] = gravar(resultado, arquivo)
+
+def linhas_resumo(resultado, funcoes=10):
+    """Linhas de texto do resumo (etapas, funções mais caras e memória) para o log."""
+    linhas = [f"[RASTREIO] Total {resultado['total_ms']:.0f} ms"]
+    for etapa in resultado['etapas']:
+        vezes = f" ({etapa['chamadas']}x)" if etapa['chamadas'] > 1 else ""
+        linhas.append(f"  {etapa['nome']}: {etapa['total_ms']:.1f} ms{vezes}")
+    if resultado.get('perfil'):
+        linhas.append("[RASTREIO] Funções (tempo acumulado):")
+        linhas.extend(f"  {funcao['acumulado_ms']:8.1f} ms  {funcao['chamadas']:>7}x  {funcao['funcao']}"
+                      for funcao in resultado['perfil'][:funcoes])
+    if resultado.get('memoria'):
+        linhas.append(f"[RASTREIO] Pico de memória: {resultado['memoria']['pico_kb']:.0f} KB")
+    if resultado.get('arquivo'):
+        linhas.append(f"[RASTREIO] Gravado em {resultado['arquivo']}")
+    return linhas
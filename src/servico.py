@@ -0,0 +1,441 @@
+import argparse
+import base64
+import hashlib
+import http.client
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlsplit
+
+# ==============================================================================
+# SERVIÇO LOCAL DE PREENCHIMENTO
+# ==============================================================================
+# Processo de longa duração, só na máquina local (HTTP em 127.0.0.1, biblioteca
+# padrão), que mantém o processor importado e os templates já indexados na memória.
+# Cada trabalho envia os bytes de uma lista e o id do template e recebe os bytes da
+# planilha preenchida; sem o custo de abrir o interpretador, importar as bibliotecas
+# e ler a estrutura do template, um trabalho repetido leva milissegundos.
+# A interface (variável AUT_LISTA_SERVICO) e a linha de comando (--servico) usam o
+# ClienteServico abaixo e processam localmente quando o serviço não responde.
+# Uso: python src/servico.py [--porta 8765] [--trabalhadores 2] [--fila 8]
+#
+# API:
+#   GET  /estado                        -> JSON com templates carregados e contadores
+#   POST /templates                     corpo = .xlsx -> {"id": ...} (id = hash do conteúdo)
+#   POST /preencher?template=ID&motor=M corpo = lista (.docx/.rtf/.csv/.txt)
+#        -> JSON {"relatorio": itens, linhas, tempos..., "planilha": .xlsx preenchido em base64}
+#        (o relatório cresce com a lista: no corpo, e não num cabeçalho, ele não tem limite de tamanho)
+
+VERSAO_PROTOCOLO = 2
+HOST_PADRAO = "127.0.0.1"
+PORTA_PADRAO = 8765
+ENDERECO_PADRAO = f"{HOST_PADRAO}:{PORTA_PADRAO}"
+
+# Endereço do serviço para a interface gráfica ("host:porta"); sem ela a interface processa localmente
+VARIAVEL_SERVICO = "AUT_LISTA_SERVICO"
+
+# Maior corpo aceito (listas e templates)
+TAMANHO_MAXIMO = 64 * 1024 * 1024
+
+MOTORES = ("openpyxl", "streaming", "patch")
+
+class ErroServico(Exception):
+    """Trabalho recusado ou com falha no serviço (status HTTP e mensagem devolvida por ele)."""
+    def __init__(self, status, mensagem):
+        super().__init__(f"{mensagem} (HTTP {status})")
+        self.status = status
+        self.mensagem = mensagem
+
+class TemplateNaoEncontrado(Exception):
+    """O serviço não tem o template pedido (o cliente deve enviá-lo e repetir o trabalho)."""
+
+def id_template(conteudo):
+    """Id de um template: hash do conteúdo do .xlsx (o mesmo arquivo tem o mesmo id no cliente e no serviço)."""
+    return hashlib.blake2b(conteudo, digest_size=16).hexdigest()
+
+# ==============================================================================
+# SERVIDOR
+# ==============================================================================
+
+class Servico:
+    """
+    Estado do serviço: templates indexados ({id: (caminho, IndiceTemplate)}), gravados em
+    '<pasta>/templates/<id>.xlsx', e o pool de trabalhadores. 'trabalhadores' trabalhos rodam
+    ao mesmo tempo, até 'fila' esperam a vez e os demais são recusados (HTTP 503).
+    """
+    def __init__(self, pasta=None, trabalhadores=2, fila=8):
+        import aquecimento
+        aquecimento.iniciar()
+
+        self.pasta_templates = os.path.join(pasta or pasta_servico_padrao(), "templates")
+        os.makedirs(self.pasta_templates, exist_ok=True)
+        self.trabalhadores = trabalhadores
+        self.templates = {}
+        self._trava = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=trabalhadores, thread_name_prefix="trabalho")
+        self._vagas = threading.BoundedSemaphore(trabalhadores + fila)
+        self.em_andamento = 0
+        self.atendidos = 0
+
+    def carregar_templates(self):
+        """Indexa os templates já gravados na pasta do serviço (o cache de templates evita reler a estrutura)."""
+        for nome in sorted(os.listdir(self.pasta_templates)):
+            identificador, extensao = os.path.splitext(nome)
+            if extensao == ".xlsx":
+                self.template(identificador)
+
+    def template(self, identificador):
+        """(caminho, IndiceTemplate) do template 'identificador'. TemplateNaoEncontrado se ele não foi enviado."""
+        with self._trava:
+            if identificador in self.templates:
+                return self.templates[identificador]
+        caminho = os.path.join(self.pasta_templates, f"{identificador}.xlsx")
+        if not re.fullmatch(r"[0-9a-f]{32}", identificador) or not os.path.exists(caminho):
+            raise TemplateNaoEncontrado(identificador)
+        from processor import indexar_template
+        indice = indexar_template(caminho)
+        with self._trava:
+            return self.templates.setdefault(identificador, (caminho, indice))
+
+    def guardar_template(self, conteudo):
+        """Grava e indexa um template recebido; retorna o id."""
+        identificador = id_template(conteudo)
+        caminho = os.path.join(self.pasta_templates, f"{identificador}.xlsx")
+        if not os.path.exists(caminho):
+            temporario = f"{caminho}.{threading.get_ident()}.tmp"
+            with open(temporario, "wb") as arquivo:
+                arquivo.write(conteudo)
+            os.replace(temporario, caminho)
+        self.template(identificador)
+        return identificador
+
+    def executar(self, identificador, conteudo, nome, motor):
+        """
+        Roda um trabalho no pool (bloqueia até terminar): retorna (bytes do .xlsx, relatório).
+        None se o pool e a fila estão cheios.
+        """
+        if not self._vagas.acquire(blocking=False):
+            return None
+        try:
+            return self._executor.submit(self._preencher, identificador, conteudo, nome, motor).result()
+        finally:
+            self._vagas.release()
+
+    def _preencher(self, identificador, conteudo, nome, motor):
+        import processor
+
+        with self._trava:
+            self.em_andamento += 1
+        try:
+            caminho_template, indice = self.template(identificador)
+            with tempfile.TemporaryDirectory(prefix="servico_") as pasta:
+                # O formato da lista é detectado pelo conteúdo; o nome só aparece nas mensagens
+                entrada = os.path.join(pasta, os.path.basename(nome) or "lista")
+                with open(entrada, "wb") as arquivo:
+                    arquivo.write(conteudo)
+                inicio = time.perf_counter()
+                dados = processor.extrair_dados_word(entrada)
+                extracao_ms = (time.perf_counter() - inicio) * 1000
+                if not dados:
+                    raise ValueError("Nenhum dado extraído da lista")
+
+                relatorio = {}
+                inicio = time.perf_counter()
+                saida = processor.preencher_planilha_excel(caminho_template, dados, motor=motor, indice=indice,
+                                                           relatorio=relatorio,
+                                                           caminho_saida=os.path.join(pasta, "processado.xlsx"))
+                preenchimento_ms = (time.perf_counter() - inicio) * 1000
+                with open(saida, "rb") as arquivo:
+                    planilha = arquivo.read()
+            return planilha, {
+                'itens': len(dados),
+                'extracao_ms': extracao_ms,
+                'preenchimento_ms': preenchimento_ms,
+                'comprimento_da_descricao': [dados.perfis[i] for i in dados.linhas_comprimento_da_descricao()],
+                'linhas_preenchidas': relatorio['linhas_preenchidas'],
+                'itens_sem_linha': [registro[0] for registro in relatorio['itens_sem_linha']],
+                'faixas_ocultas': relatorio['faixas_ocultas'],
+                'tempos_ms': relatorio['tempos_ms'],
+            }
+        finally:
+            with self._trava:
+                self.em_andamento -= 1
+                self.atendidos += 1
+
+    def estado(self):
+        import aquecimento
+        with self._trava:
+            return {
+                'versao': VERSAO_PROTOCOLO,
+                'templates': sorted(self.templates),
+                'trabalhadores': self.trabalhadores,
+                'em_andamento': self.em_andamento,
+                'atendidos': self.atendidos,
+                'aquecimento_ms': aquecimento.tempos_ms(),
+            }
+
+def pasta_servico_padrao():
+    """Pasta dos templates do serviço: 'servico', ao lado do cache de templates."""
+    from cache_template import pasta_cache_padrao
+    return os.path.join(os.path.dirname(pasta_cache_padrao()), "servico")
+
+class _Requisicao(BaseHTTPRequestHandler):
+    # HTTP/1.1: o cliente reaproveita a conexão entre trabalhos
+    protocol_version = "HTTP/1.1"
+    # Cabeçalhos e corpo saem em escritas separadas: sem isto o Nagle + ACK atrasado somam ~40 ms por resposta
+    disable_nagle_algorithm = True
+
+    def log_message(self, formato, *args):
+        print(f"[SERVIÇO] {self.address_string()} {formato % args}", file=sys.stderr)
+
+    def _responder(self, status, dados, cabecalhos=None):
+        corpo = json.dumps(dados, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(corpo)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _ler_corpo(self):
+        tamanho = int(self.headers.get("Content-Length") or 0)
+        if tamanho > TAMANHO_MAXIMO:
+            self._responder(413, {'erro': f"Corpo maior que {TAMANHO_MAXIMO} bytes"})
+            self.close_connection = True
+            return None
+        return self.rfile.read(tamanho)
+
+    def do_GET(self):
+        if urlsplit(self.path).path == "/estado":
+            self._responder(200, self.server.servico.estado())
+        else:
+            self._responder(404, {'erro': "Rota desconhecida"})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        parametros = {nome: valores[-1] for nome, valores in parse_qs(url.query).items()}
+        corpo = self._ler_corpo()
+        if corpo is None:
+            return
+        servico = self.server.servico
+        try:
+            if url.path == "/templates":
+                self._responder(200, {'id': servico.guardar_template(corpo)})
+            elif url.path == "/preencher":
+                motor = parametros.get("motor", "patch")
+                if motor not in MOTORES:
+                    raise ValueError(f"Motor desconhecido: {motor}")
+                resultado = servico.executar(parametros.get("template", ""), corpo,
+                                             parametros.get("nome", ""), motor)
+                if resultado is None:
+                    self._responder(503, {'erro': "Serviço ocupado: tente de novo"}, cabecalhos={"Retry-After": "1"})
+                    return
+                planilha, relatorio = resultado
+                self._responder(200, {'relatorio': relatorio, 'planilha': base64.b64encode(planilha).decode("ascii")})
+            else:
+                self._responder(404, {'erro': "Rota desconhecida"})
+        except TemplateNaoEncontrado as e:
+            self._responder(404, {'erro': f"Template não encontrado: {e.args[0]}"})
+        except ValueError as e:
+            self._responder(422, {'erro': str(e)})
+        except Exception as e:
+            self._responder(500, {'erro': f"{type(e).__name__}: {e}"})
+
+def servir(host=HOST_PADRAO, porta=PORTA_PADRAO, pasta=None, trabalhadores=2, fila=8):
+    """Sobe o serviço e atende até Ctrl+C."""
+    import aquecimento
+
+    servico = Servico(pasta, trabalhadores, fila)
+    servidor = ThreadingHTTPServer((host, porta), _Requisicao)
+    servidor.daemon_threads = True
+    servidor.servico = servico
+    aquecimento.esperar()
+    servico.carregar_templates()
+    print(f"[SERVIÇO] Atendendo em http://{host}:{servidor.server_port} ({trabalhadores} trabalhadores,"
+          f" {len(servico.templates)} templates carregados)", file=sys.stderr)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+# ==============================================================================
+# CLIENTE
+# ==============================================================================
+
+def endereco_configurado():
+    """Endereço do serviço em AUT_LISTA_SERVICO ("host:porta"), ou None se não configurado."""
+    return os.environ.get(VARIAVEL_SERVICO) or None
+
+class ClienteServico:
+    """
+    Cliente do serviço, com uma conexão reaproveitada entre os trabalhos.
+    Serviço fora do ar ou conexão perdida gera ConnectionError (também para tempo esgotado e endereço
+    inválido); trabalho recusado, ErroServico. Erros dos arquivos locais continuam como OSError.
+    """
+    def __init__(self, endereco=ENDERECO_PADRAO, tempo_limite=300):
+        host, _, porta = endereco.rpartition(":")
+        self.host = host or HOST_PADRAO
+        self.porta = int(porta)
+        self.tempo_limite = tempo_limite
+        self._conexao = None
+
+    def fechar(self):
+        if self._conexao:
+            self._conexao.close()
+            self._conexao = None
+
+    def _requisicao(self, metodo, caminho, corpo=None):
+        """(status, cabeçalhos, corpo) da resposta. Uma conexão reaproveitada que caiu é refeita uma vez."""
+        for tentativa in range(2):
+            reaproveitada = self._conexao is not None
+            if not reaproveitada:
+                self._conexao = http.client.HTTPConnection(self.host, self.porta, timeout=self.tempo_limite)
+            try:
+                self._conexao.request(metodo, caminho, body=corpo)
+                resposta = self._conexao.getresponse()
+                return resposta.status, resposta.headers, resposta.read()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                self.fechar()
+                if not reaproveitada or tentativa:
+                    raise
+            except http.client.HTTPException as e:
+                # Resposta que não é HTTP válido: conta como serviço indisponível (quem chama processa localmente)
+                self.fechar()
+                raise ConnectionError(f"Resposta inválida do serviço: {e}") from e
+            except ConnectionError:
+                self.fechar()
+                raise
+            except OSError as e:
+                # Tempo esgotado, endereço que não resolve, rede fora...: também é serviço indisponível
+                self.fechar()
+                raise ConnectionError(f"{type(e).__name__}: {e}") from e
+
+    @staticmethod
+    def _erro(status, corpo):
+        try:
+            mensagem = json.loads(corpo)['erro']
+        except (ValueError, KeyError, TypeError):
+            mensagem = corpo.decode("utf-8", "replace")
+        return ErroServico(status, mensagem)
+
+    def estado(self):
+        status, _, corpo = self._requisicao("GET", "/estado")
+        if status != 200:
+            raise self._erro(status, corpo)
+        return json.loads(corpo)
+
+    def enviar_template(self, conteudo):
+        """Envia os bytes de um template; retorna o id."""
+        status, _, corpo = self._requisicao("POST", "/templates", conteudo)
+        if status != 200:
+            raise self._erro(status, corpo)
+        return json.loads(corpo)['id']
+
+    def preencher_bytes(self, lista, template, nome="", motor="patch"):
+        """
+        Preenche o template (bytes) com a lista (bytes): retorna (bytes do .xlsx, relatório).
+        O template só é enviado quando o serviço ainda não o tem.
+        """
+        identificador = id_template(template)
+        caminho = f"/preencher?template={identificador}&motor={quote(motor)}&nome={quote(nome)}"
+        status, _, corpo = self._requisicao("POST", caminho, lista)
+        if status == 404 and identificador not in self.estado()['templates']:
+            self.enviar_template(template)
+            status, _, corpo = self._requisicao("POST", caminho, lista)
+        if status != 200:
+            raise self._erro(status, corpo)
+        resposta = json.loads(corpo)
+        return base64.b64decode(resposta['planilha']), resposta['relatorio']
+
+    def preencher(self, caminho_lista, caminho_planilha, caminho_saida=None, motor="patch", relatorio=None):
+        """
+        Equivalente remoto de extrair_dados_word + preencher_planilha_excel: grava o resultado
+        em caminho_saida (padrão: '<template>_processado.xlsx') e retorna o caminho gerado.
+        relatorio: dict opcional que recebe o relatório do serviço.
+        """
+        from processor import nome_arquivo_processado
+
+        with open(caminho_lista, "rb") as arquivo:
+            lista = arquivo.read()
+        with open(caminho_planilha, "rb") as arquivo:
+            template = arquivo.read()
+        planilha, dados = self.preencher_bytes(lista, template, os.path.basename(caminho_lista), motor)
+        caminho_processado = nome_arquivo_processado(caminho_planilha, caminho_saida)
+        with open(caminho_processado, "wb") as arquivo:
+            arquivo.write(planilha)
+        if relatorio is not None:
+            relatorio.update(dados)
+        return caminho_processado
+
+def processar_lote_via_servico(arquivos, caminho_planilha, endereco=ENDERECO_PADRAO, pasta_saida=None, motor='patch',
+                               caminho_saida=None):
+    """
+    Como lote.processar_lote (listas separadas, sem combinar), mas cada lista é preenchida pelo serviço.
+    Retorna o resumo no mesmo formato. Serviço fora do ar antes de atender o primeiro trabalho gera
+    ConnectionError (nada foi gravado: quem chama pode processar tudo localmente). Depois disso, a queda
+    do serviço e os erros dos arquivos locais (lista ilegível, pasta de saída sem permissão) ficam no
+    'erro' de cada lista, e as demais continuam.
+    """
+    from lote import nomes_de_saida
+
+    pasta_saida = pasta_saida or os.path.dirname(os.path.abspath(caminho_planilha))
+    extensao = os.path.splitext(caminho_planilha)[1]
+    saida_unica = caminho_saida if len(arquivos) == 1 else None
+    nomes = nomes_de_saida(arquivos)
+
+    cliente = ClienteServico(endereco)
+    resumo = []
+    atendido = False  # o serviço já respondeu a algum trabalho?
+    try:
+        for caminho in arquivos:
+            item = {'arquivo': caminho, 'itens': 0, 'extracao_ms': 0.0, 'preenchimento_ms': 0.0, 'saida': None,
+                    'erro': None, 'comprimento_da_descricao': []}
+            resumo.append(item)
+            relatorio = {}
+            try:
+                item['saida'] = cliente.preencher(
+                    caminho, caminho_planilha,
+                    saida_unica or os.path.join(pasta_saida, f"{nomes[caminho]}_processado{extensao}"), motor, relatorio)
+            except ErroServico as e:
+                atendido = True
+                item['erro'] = e.mensagem
+                continue
+            except ConnectionError as e:
+                if not atendido:
+                    raise
+                item['erro'] = f"Serviço indisponível: {e}"
+                continue
+            except OSError as e:
+                item['erro'] = str(e)
+                continue
+            atendido = True
+            # Os nomes dos itens sem linha voltam como registros de um elemento, como no resumo local
+            relatorio['itens_sem_linha'] = [[perfil] for perfil in relatorio['itens_sem_linha']]
+            item.update(relatorio)
+            print(f"[SERVIÇO] {os.path.basename(caminho)}: {item['itens']} itens -> {item['saida']}")
+    finally:
+        cliente.fechar()
+    return resumo
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serviço local que preenche a planilha de aço sem reabrir o Python.")
+    parser.add_argument("--host", default=HOST_PADRAO, help="Endereço de escuta (padrão: só a máquina local)")
+    parser.add_argument("--porta", type=int, default=PORTA_PADRAO)
+    parser.add_argument("--trabalhadores", type=int, default=2, help="Trabalhos processados ao mesmo tempo")
+    parser.add_argument("--fila", type=int, default=8, help="Trabalhos em espera antes de recusar (HTTP 503)")
+    parser.add_argument("--pasta", help="Pasta dos templates recebidos (padrão: ao lado do cache de templates)")
+    args = parser.parse_args(argv)
+    servir(args.host, args.porta, args.pasta, args.trabalhadores, args.fila)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,12 @@
+from array import array
+from functools import lru_cache
+
+# As mesmas bitolas ("1/4\"", "1.1/2\"", "2,65"...) se repetem por toda a lista; guardamos as últimas conversões
+TAMANHO_CACHE_CONVERSAO = 1024
+
+@lru_cache(maxsize=TAMANHO_CACHE_CONVERSAO)
 def convert_to_mm(dim_str):
-    """Converte dimensões em polegadas (ex: "1.1/2"") para mm."""
+    """Converte dimensões em polegadas (ex: "1.1/2"") para mm (memoizado por texto)."""
     dim_str = dim_str.strip().replace(',', '.')
     total_mm = 0.0
     try:
@@ -19,6 +26,15 @@ def convert_to_mm(dim_str):
     except (ValueError, ZeroDivisionError): return 0.0
     return total_mm
 
+def converter_varios_mm(dimensoes):
+    """Converte uma sequência de dimensões de uma vez e devolve um array('d') compacto, em mm."""
+    return array('d', map(convert_to_mm, dimensoes))
+
+def estatisticas_conversao():
+    """Acertos e falhas do cache de convert_to_mm: {'acertos', 'falhas', 'tamanho', 'limite'}."""
+    info = convert_to_mm.cache_info()
+    return {'acertos': info.hits, 'falhas': info.misses, 'tamanho': info.currsize, 'limite': info.maxsize}
+
 
 def normalizar_viga_w(nome_bruto):
     """
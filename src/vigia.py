@@ -0,0 +1,256 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from cache_template import chave_template
+from lote import EXTENSOES_LISTA, imprimir_resumo, nomes_de_saida, processar_lote
+
+# ==============================================================================
+# PASTA VIGIADA: PROCESSA AS LISTAS QUE CHEGAM
+# ==============================================================================
+# Os orçamentistas salvam as exportações do MCalc numa pasta do projeto. O vigia
+# varre a pasta a cada 'intervalo' segundos (por varredura, que funciona igual no
+# Windows e em pastas de rede) e processa cada lista nova contra o template, no
+# pool de processos do lote. Uma lista só entra quando está estável: tamanho e data
+# sem mudar por 'espera' segundos e sem arquivo de trava '~$' do Word (aberta no
+# Word ou ainda sendo salva); uma trava mais antiga que a lista ou que
+# IDADE_MAXIMA_TRAVA é sobra de um Word fechado à força e não segura a lista. Listas já processadas, identificadas pelo hash do
+# conteúdo, são puladas, mesmo renomeadas ou copiadas de novo; se o template
+# mudar, elas são processadas outra vez. Uma lista que falhou é tentada de novo
+# com espera crescente, até LIMITE_TENTATIVAS vezes (depois, só se o conteúdo ou
+# o template mudar).
+# Uso: python src/vigia.py PASTA "TABELA-DE-AÇO R8.xlsx" [--saida pasta] [--intervalo 2] [--espera 2] [--uma-vez]
+
+# Mudou o formato do registro? Incremente para reprocessar tudo.
+VERSAO_REGISTRO = 1
+ARQUIVO_REGISTRO = ".vigia.json"
+
+# Trava '~$' mais velha que isto (segundos) é considerada abandonada
+IDADE_MAXIMA_TRAVA = 3600.0
+
+# Tentativas de uma lista que falhou e espera antes da 2ª (dobra a cada nova falha)
+LIMITE_TENTATIVAS = 3
+ESPERA_NOVA_TENTATIVA = 30.0
+
+def hash_conteudo(caminho):
+    """Hash do conteúdo do arquivo (o nome e a data não entram)."""
+    with open(caminho, "rb") as arquivo:
+        return hashlib.blake2b(arquivo.read(), digest_size=16).hexdigest()
+
+def nome_trava(nome):
+    """
+    Nome do arquivo de trava que o Word cria para 'nome': '~$' no lugar dos dois primeiros
+    caracteres ('Lista material.docx' -> '~$sta material.docx'); com 7 caracteres antes da
+    extensão, só o primeiro é trocado, e nomes mais curtos ficam inteiros.
+    """
+    tamanho = len(os.path.splitext(nome)[0])
+    corte = 2 if tamanho >= 8 else 1 if tamanho == 7 else 0
+    return "~$" + nome[corte:]
+
+def em_edicao(nome, informacoes, travas, agora=None):
+    """
+    A lista está aberta no Word? travas = {nome da trava em minúsculas: os.stat da trava}.
+    Travas mais antigas que a lista (ela foi salva depois) ou que IDADE_MAXIMA_TRAVA são ignoradas.
+    """
+    trava = travas.get(nome_trava(nome).lower())
+    if trava is None:
+        return False
+    agora = time.time() if agora is None else agora
+    return trava.st_mtime_ns >= informacoes.st_mtime_ns and agora - trava.st_mtime < IDADE_MAXIMA_TRAVA
+
+class Vigia:
+    """
+    Estado da vigília: as listas observadas ({caminho: (tamanho, mtime_ns, desde)}) e o registro
+    das já processadas ({hash: {'arquivo', 'saida', 'template', 'erro', 'tentativas', 'data'}}), gravado em
+    '<pasta de saída>/.vigia.json' para valer entre execuções.
+    """
+    def __init__(self, pasta, caminho_planilha, pasta_saida=None, espera=2.0, processos=None, motor='patch'):
+        self.pasta = pasta
+        self.caminho_planilha = caminho_planilha
+        self.pasta_saida = os.path.abspath(pasta_saida or pasta)
+        self.espera = espera
+        self.processos = processos
+        self.motor = motor
+        self.observadas = {}
+        self.tratadas = {}  # {caminho: (tamanho, mtime_ns)} já decididas nesta execução (não refaz o hash)
+        self.adiadas = {}  # {hash: instante (time.monotonic) da próxima tentativa} das listas que falharam
+        self.caminho_registro = os.path.join(self.pasta_saida, ARQUIVO_REGISTRO)
+        self.registro = self._ler_registro()
+
+    def _ler_registro(self):
+        try:
+            with open(self.caminho_registro, encoding="utf-8") as arquivo:
+                registro = json.load(arquivo)
+        except (OSError, ValueError):
+            return {}
+        return registro.get("processados", {}) if registro.get("versao") == VERSAO_REGISTRO else {}
+
+    def _salvar_registro(self):
+        temporario = f"{self.caminho_registro}.{os.getpid()}.tmp"
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            json.dump({"versao": VERSAO_REGISTRO, "processados": self.registro}, arquivo, ensure_ascii=False, indent=1)
+        os.replace(temporario, self.caminho_registro)
+
+    def varrer(self, agora=None):
+        """Atualiza as observações da pasta e retorna as listas estáveis ainda não tratadas."""
+        agora = time.monotonic() if agora is None else agora
+        nomes = os.listdir(self.pasta)
+        travas = {}
+        for nome in nomes:
+            if nome.startswith('~$'):
+                try:
+                    travas[nome.lower()] = os.stat(os.path.join(self.pasta, nome))
+                except OSError:
+                    continue  # o Word fechou a lista durante a varredura
+        atuais = {}
+        estaveis = []
+        for nome in sorted(nomes):
+            if not nome.lower().endswith(EXTENSOES_LISTA) or nome.startswith('~$'):
+                continue
+            caminho = os.path.join(self.pasta, nome)
+            try:
+                informacoes = os.stat(caminho)
+            except OSError:
+                continue  # apagada ou renomeada durante a varredura
+            assinatura = (informacoes.st_size, informacoes.st_mtime_ns)
+            anterior = self.observadas.get(caminho)
+            desde = anterior[2] if anterior and anterior[:2] == assinatura else agora
+            atuais[caminho] = (*assinatura, desde)
+            if (agora - desde >= self.espera and self.tratadas.get(caminho) != assinatura
+                    and informacoes.st_size and not em_edicao(nome, informacoes, travas)):
+                estaveis.append(caminho)
+        self.observadas = atuais
+        return estaveis
+
+    def _pular(self, resumo, template):
+        """
+        A lista com este hash já foi processada com o mesmo template (e a saída ainda existe),
+        ou já falhou LIMITE_TENTATIVAS vezes?
+        """
+        registro = self.registro.get(resumo)
+        if not registro or registro['template'] != template:
+            return False
+        if registro['erro']:
+            return registro.get('tentativas', 1) >= LIMITE_TENTATIVAS
+        return bool(registro['saida'] and os.path.exists(registro['saida']))
+
+    def _tentativas_anteriores(self, resumo, template):
+        """Quantas vezes a lista com este hash já falhou com este template."""
+        registro = self.registro.get(resumo)
+        if registro and registro['template'] == template and registro['erro']:
+            return registro.get('tentativas', 1)
+        return 0
+
+    def processar(self, caminhos):
+        """Processa as listas novas entre 'caminhos' e as registra. Retorna o resumo do lote (vazio se nada novo)."""
+        template = chave_template(self.caminho_planilha)
+        agora = time.monotonic()
+        novas = {}  # {caminho: hash}, uma lista por conteúdo
+        assinaturas = {}
+        for caminho in caminhos:
+            try:
+                informacoes = os.stat(caminho)
+                resumo = hash_conteudo(caminho)
+            except OSError:
+                continue
+            assinaturas[caminho] = (informacoes.st_size, informacoes.st_mtime_ns)
+            if resumo in novas.values() or self._pular(resumo, template):
+                motivo = "já processada"
+                if resumo not in novas.values() and self.registro[resumo]['erro']:
+                    motivo = f"falhou {LIMITE_TENTATIVAS} vezes (salve a lista corrigida para tentar de novo)"
+                print(f"[VIGIA] {os.path.basename(caminho)}: {motivo}, pulando")
+                self.tratadas[caminho] = assinaturas[caminho]
+                continue
+            if self.adiadas.get(resumo, agora) > agora:
+                continue  # falhou há pouco: espera a próxima tentativa (sem marcar como tratada)
+            novas[caminho] = resumo
+        if not novas:
+            return []
+
+        os.makedirs(self.pasta_saida, exist_ok=True)
+        # Nomes decididos com todas as listas da pasta: 'lista.rtf' que chega depois de 'lista.docx'
+        # não sobrescreve a planilha gerada para ela
+        nomes = nomes_de_saida(sorted(set(self.observadas) | set(novas)))
+        resumo_lote = processar_lote(list(novas), self.caminho_planilha, self.pasta_saida,
+                                     processos=self.processos, motor=self.motor, nomes_saida=nomes)
+        data = datetime.now().isoformat(timespec="seconds")
+        for item in resumo_lote:
+            resumo = novas[item['arquivo']]
+            tentativas = self._tentativas_anteriores(resumo, template) + 1 if item['erro'] else 0
+            if item['erro']:
+                # Não marca como tratada: a varredura a devolve e ela é tentada de novo depois da espera
+                self.adiadas[resumo] = agora + ESPERA_NOVA_TENTATIVA * 2 ** (tentativas - 1)
+            else:
+                self.adiadas.pop(resumo, None)
+                self.tratadas[item['arquivo']] = assinaturas[item['arquivo']]
+            self.registro[resumo] = {
+                'arquivo': os.path.basename(item['arquivo']),
+                'saida': item['saida'],
+                'template': template,
+                'erro': item['erro'],
+                'tentativas': tentativas,
+                'data': data,
+            }
+        self._salvar_registro()
+        return resumo_lote
+
+    def executar(self, intervalo=2.0, uma_vez=False):
+        """
+        Varre e processa até Ctrl+C. Com uma_vez, processa o que já está estável na pasta e termina
+        (duas varreduras separadas por 'espera' segundos), para agendadores.
+        """
+        print(f"[VIGIA] Vigiando {self.pasta} -> {self.pasta_saida} (template {os.path.basename(self.caminho_planilha)})")
+        try:
+            if uma_vez:
+                self.varrer()
+                time.sleep(self.espera)
+                self._ciclo()
+                return
+            while True:
+                self._ciclo()
+                time.sleep(intervalo)
+        except KeyboardInterrupt:
+            print("\n[VIGIA] Encerrado.")
+
+    def _ciclo(self):
+        try:
+            estaveis = self.varrer()
+            resumo = self.processar(estaveis) if estaveis else []
+        except Exception as e:
+            # Template aberto no Excel ou corrompido, pasta de rede fora do ar...: registra e tenta de
+            # novo na próxima varredura (as falhas de cada lista já ficam no resumo e no registro)
+            print(f"[VIGIA] Erro: {type(e).__name__}: {e}")
+            return
+        if resumo:
+            imprimir_resumo(resumo)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vigia uma pasta e processa cada lista do MCalc que chega.")
+    parser.add_argument("pasta", help="Pasta onde as listas (.docx, .rtf) são salvas")
+    parser.add_argument("template", help="Planilha modelo (.xlsx)")
+    parser.add_argument("--saida", help="Pasta dos arquivos gerados e do registro (padrão: a pasta vigiada)")
+    parser.add_argument("--intervalo", type=float, default=2.0, help="Segundos entre as varreduras")
+    parser.add_argument("--espera", type=float, default=2.0,
+                        help="Segundos sem mudança de tamanho ou data para considerar a lista pronta")
+    parser.add_argument("--processos", type=int, default=None, help="Nº de processos para ler as listas")
+    parser.add_argument("--motor", default="patch", choices=("openpyxl", "streaming", "patch"))
+    parser.add_argument("--uma-vez", action="store_true", help="Processa o que está na pasta e termina")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.pasta):
+        print(f"Pasta não encontrada: {args.pasta}", file=sys.stderr)
+        return 2
+    if not os.path.exists(args.template):
+        print(f"Planilha Excel não encontrada: {args.template}", file=sys.stderr)
+        return 2
+    Vigia(args.pasta, args.template, args.saida, args.espera, args.processos, args.motor).executar(
+        args.intervalo, args.uma_vez)
+    return 0
+
+# Protegido: com 'spawn' os processos do pool de extração importam este módulo de novo
+if __name__ == "__main__":
+    sys.exit(main())